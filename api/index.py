@@ -2,36 +2,85 @@
 
 import sys
 import os
-from fastapi import FastAPI
+import json
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import time
 import asyncio
-from fastapi.responses import JSONResponse
+import threading
+import contextvars
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 
 # --- Add python_helpers to the system path ---
 # This is a key step for Vercel to find your modules
 sys.path.append(os.path.realpath('.'))
 
 # --- Import your helper functions ---
-from python_helpers.yt_downloader import download_audio_from_url
-from python_helpers.audio_transcribe import audio_main as run_transcription_job
-from python_helpers.embed_text import embed_main as run_embedding_pipeline
-from python_helpers.blog_generation import generate_blog_post
-from python_helpers.rag import setup_pinecone_index, load_and_upsert_data, query_video
+from python_helpers.yt_downloader import download_audio_from_url, extract_video_id, is_video_id, expand_playlist, AUDIO_CONFIG
+from python_helpers.audio_transcribe import transcribe_audio as run_transcription_job, JOB_PARAMETERS, close_http_client, get_audio_duration
+from python_helpers.audio_segments import SEGMENT_CONFIG, TRIM_CONFIG, trim_silence, remap_transcript
+from python_helpers.embed_text import embed_main as run_embedding_pipeline, embeddings_path, EMBED_STORE_DTYPE
+from python_helpers.embedding_service import EMBEDDING_CONFIG, warmup_in_background
+from python_helpers.chunking import CHUNK_CONFIG
+from python_helpers.blog_generation import generate_blog_post_async, blog_post_events, get_llm
+from python_helpers.rag import setup_vector_index, load_and_upsert_data, query_video, answer_questions, get_groq_client, answer_executor
+from python_helpers.embedding_service import get_model as get_embedding_model
+from python_helpers.jobs import JobManager
+from python_helpers.artifact_cache import ArtifactCache
+from python_helpers.metrics import span, record, collect_spans, render_prometheus
 
 # --- Models for API Request/Response ---
 class VideoRequest(BaseModel):
     url: str
 
+class BatchRequest(BaseModel):
+    urls: list[str] = []
+    playlist_url: str | None = None
+
 class QueryRequest(BaseModel):
     query: str
+    video_id: str = ""
+
+class MultiQueryRequest(BaseModel):
+    queries: list[str]
+    video_id: str = ""
 
 class BlogRequest(BaseModel):
     transcript_file: str
 
-# --- Initialize App and Pinecone ---
-app = FastAPI()
-pinecone_index = setup_pinecone_index()
+# --- Initialize App and Vector Index ---
+# Set EMBED_WARMUP=false on serverless deployments to keep cold starts lean
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "true").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model off the request path
+    if EMBED_WARMUP:
+        warmup_in_background()
+    yield
+    # Release the pooled Sarvam connections on shutdown
+    await close_http_client()
+
+app = FastAPI(lifespan=lifespan)
+
+# The index (which may create a Pinecone index and wait for it) is set up on first use
+@lru_cache(maxsize=1)
+def get_vector_index():
+    return setup_vector_index()
+
+job_manager = JobManager()
+artifact_cache = ArtifactCache()
+
+# Each stage's cache key covers the config of every stage that feeds into it
+AUDIO_STAGE_CONFIG = {"audio": AUDIO_CONFIG}
+TRANSCRIPT_STAGE_CONFIG = {
+    **AUDIO_STAGE_CONFIG, "transcribe": JOB_PARAMETERS, "segments": SEGMENT_CONFIG, "trim": TRIM_CONFIG
+}
+EMBED_STAGE_CONFIG = {**TRANSCRIPT_STAGE_CONFIG, "embed": EMBEDDING_CONFIG, "chunk": CHUNK_CONFIG, "store": {"format": "npy", "dtype": EMBED_STORE_DTYPE}}
+AUDIO_FILE_NAME = f"audio_16Khz.{AUDIO_CONFIG['codec']}"
 
 # --- CORS Middleware ---
 # This allows your Next.js app to talk to this API
@@ -43,50 +92,196 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Video Pipeline (runs inside a background job) ---
+async def transcribe_stage(audio_file: str, workspace: str, report: dict) -> str | None:
+    """
+    Transcribes the audio, first cutting long silences when TRIM_SILENCE is on. The
+    transcript's timestamps are then mapped back onto the original video timeline.
+    """
+    upload_file = audio_file
+    trim = None
+    if TRIM_CONFIG["enabled"]:
+        trimmed_file = os.path.join(workspace, "trimmed" + os.path.splitext(audio_file)[1])
+        duration = await get_audio_duration(audio_file)
+        with span("ffmpeg.trim"):
+            trim = await asyncio.to_thread(trim_silence, audio_file, trimmed_file, duration)
+        if trim:
+            upload_file = trim["path"]
+            report["silence_trim"] = {
+                key: trim[key] for key in ("original_seconds", "seconds_saved", "bytes_saved")
+            }
+            print(f"🔇 Trimmed {trim['seconds_saved']}s / {trim['bytes_saved']} bytes of silence")
+
+    transcript_file = await run_transcription_job(upload_file, os.path.join(workspace, "transcribed_output"))
+    if trim:
+        os.remove(trim["path"])
+        if transcript_file:
+            with open(transcript_file, "r") as f:
+                transcript = remap_transcript(json.load(f), trim["offset_map"])
+            with open(transcript_file, "w") as f:
+                json.dump(transcript, f)
+    return transcript_file
+
+# The artifact cache copies whole files, so it runs off the event loop
+async def fetch_artifact(video_id: str, config: dict, name: str, destination: str) -> bool:
+    return await asyncio.to_thread(artifact_cache.fetch, video_id, config, name, destination)
+
+async def store_artifact(video_id: str, config: dict, name: str, source: str):
+    await asyncio.to_thread(artifact_cache.put, video_id, config, name, source)
+
+async def run_video_pipeline(job):
+    """
+    Runs download, transcription, embedding and upsert inside the job's workspace.
+    Stages whose output is already in the artifact cache are skipped, and so are
+    the stages that would only have fed them.
+    """
+    print(f"Processing URL: {job.url} (job {job.id})")
+    video_id = extract_video_id(job.url)
+    audio_file = os.path.join(job.workspace, AUDIO_FILE_NAME)
+    transcript_file = os.path.join(job.workspace, "transcript.json")
+    embedded_file = os.path.join(job.workspace, "0_embedded_gemini.json")
+    cached_stages = []
+    report = {}
+
+    has_embeddings = (
+        await fetch_artifact(video_id, EMBED_STAGE_CONFIG, "embedded.json", embedded_file)
+        and await fetch_artifact(video_id, EMBED_STAGE_CONFIG, "embedded.npy", embeddings_path(embedded_file))
+    )
+    has_transcript = await fetch_artifact(video_id, TRANSCRIPT_STAGE_CONFIG, "transcript.json", transcript_file)
+    has_audio = not has_transcript and await fetch_artifact(video_id, AUDIO_STAGE_CONFIG, AUDIO_FILE_NAME, audio_file)
+
+    # 1. Download
+    async with job.run_stage("download", wait=not (has_transcript or has_audio)):
+        if has_transcript or has_audio:
+            cached_stages.append("download")
+        else:
+            audio_file = await asyncio.to_thread(download_audio_from_url, job.url, job.workspace)
+            await store_artifact(video_id, AUDIO_STAGE_CONFIG, AUDIO_FILE_NAME, audio_file)
+
+    # 2. Transcribe
+    async with job.run_stage("transcribe", wait=not has_transcript):
+        if has_transcript:
+            cached_stages.append("transcribe")
+        else:
+            transcript_file = await transcribe_stage(audio_file, job.workspace, report)
+            if not transcript_file:
+                raise Exception("Transcription failed.")
+            await store_artifact(video_id, TRANSCRIPT_STAGE_CONFIG, "transcript.json", transcript_file)
+    # The audio is no longer needed once the transcript is on disk
+    if os.path.exists(audio_file):
+        os.remove(audio_file)
+
+    # 3. Embed
+    async with job.run_stage("embed", wait=not has_embeddings):
+        if has_embeddings:
+            cached_stages.append("embed")
+        else:
+            embedded_file = await run_embedding_pipeline(transcript_file, embedded_file, report)
+            if not embedded_file:
+                raise Exception("Embedding failed.")
+            await store_artifact(video_id, EMBED_STAGE_CONFIG, "embedded.json", embedded_file)
+            await store_artifact(video_id, EMBED_STAGE_CONFIG, "embedded.npy", embeddings_path(embedded_file))
+
+    # 4. Upsert to the vector index
+    async with job.run_stage("upsert"):
+        index = await asyncio.to_thread(get_vector_index)
+        if not await asyncio.to_thread(load_and_upsert_data, index, embedded_file, video_id):
+            raise Exception("Upsert failed: no vectors were written.")
+
+    print(f"Pipeline complete for job {job.id}! Cached stages: {cached_stages or 'none'}")
+    # Return the path to the transcript file for the blog gen
+    return {"transcript_file": transcript_file, "video_id": video_id, "cached_stages": cached_stages, **report}
+
 # --- API Endpoint 1: Process Video ---
-@app.post("/api/process-video")
+@app.post("/api/process-video", status_code=202)
 async def process_video(request: VideoRequest):
-    try:
-        print(f"Processing URL: {request.url}")
-        
-        # 1. Download
-        download_audio_from_url(request.url)
-        
-        # 2. Transcribe
-        transcript_file = await run_transcription_job()
-        if not transcript_file:
-            raise Exception("Transcription failed.")
-            
-        # 3. Embed
-        embedded_file = await run_embedding_pipeline(transcript_file)
-        if not embedded_file:
-            raise Exception("Embedding failed.")
-            
-        # 4. Upsert to Pinecone
-        load_and_upsert_data(pinecone_index, embedded_file)
-        
-        print("Pipeline complete!")
-        # Return the path to the transcript file for the blog gen
-        return {"status": "success", "transcript_file": transcript_file}
+    job = job_manager.submit(request.url, run_video_pipeline)
+    return {"status": "queued", "job_id": job.id}
 
-    except Exception as e:
-        print(f"Error in pipeline: {e}")
-        # Return a 500 error
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
         return JSONResponse(
-            status_code=500,
-            content={"status": "error", "message": str(e)}
+            status_code=404,
+            content={"status": "error", "message": f"Job {job_id} not found."}
         )
+    return job.to_dict()
+
+# Upper bound on the videos one batch request may queue
+BATCH_MAX_VIDEOS = int(os.getenv("BATCH_MAX_VIDEOS", "200"))
+
+@app.post("/api/process-batch", status_code=202)
+async def process_batch(request: BatchRequest):
+    """
+    Queues every video from `urls` and/or a playlist or channel URL. Each video runs the
+    normal pipeline; per-stage limits let downloads, Sarvam jobs, embedding and upserts
+    overlap across videos.
+    """
+    urls = list(request.urls)
+    if request.playlist_url:
+        try:
+            urls += await asyncio.to_thread(expand_playlist, request.playlist_url, BATCH_MAX_VIDEOS)
+        except Exception as e:
+            return JSONResponse(
+                status_code=400,
+                content={"status": "error", "message": f"Could not expand playlist: {e}"}
+            )
+    # The same video listed twice would only race itself through the pipeline
+    by_video = {}
+    for url in urls:
+        by_video.setdefault(extract_video_id(url), url)
+    unique = list(by_video.values())[:BATCH_MAX_VIDEOS]
+    if not unique:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": "No videos to process."}
+        )
+    batch = job_manager.submit_batch(unique, run_video_pipeline, source=request.playlist_url)
+    return {"status": "queued", "batch_id": batch.id, "job_ids": batch.job_ids, "videos": len(unique)}
+
+@app.get("/api/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = job_manager.get_batch(batch_id)
+    if not batch:
+        return JSONResponse(
+            status_code=404,
+            content={"status": "error", "message": f"Batch {batch_id} not found."}
+        )
+    return batch.to_dict(job_manager.jobs)
 
 # --- API Endpoint 2: Ask Question (RAG) ---
+def invalid_video_id(video_id: str) -> JSONResponse | None:
+    """Rejects ids process-video could not have produced; "" is the index's default namespace."""
+    if video_id and not is_video_id(video_id):
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": f"Invalid video_id: {video_id!r}"}
+        )
+    return None
+
+async def run_answering(function, *args):
+    """Runs `function(*args)` on the answer pool, in the current context so its spans count."""
+    return await asyncio.get_running_loop().run_in_executor(
+        answer_executor, contextvars.copy_context().run, function, *args
+    )
+
 @app.post("/api/ask-question")
 async def ask_question(request: QueryRequest):
+    if error := invalid_video_id(request.video_id):
+        return error
     try:
-        answer_stream, contexts = query_video(pinecone_index, request.query)
-        
-        # We need to collect the streamed response
-        final_answer = "".join([chunk for chunk in answer_stream])
+        report = {}
+        with collect_spans() as spans:
+            index = await asyncio.to_thread(get_vector_index)
+            answer_stream, contexts = await asyncio.to_thread(
+                query_video, index, request.query, request.video_id, report=report
+            )
+
+            # We need to collect the streamed response (off the event loop)
+            final_answer = await run_answering("".join, answer_stream)
             
-        return {"answer": final_answer, "contexts": contexts}
+        return {"answer": final_answer, "contexts": contexts, **report, "spans": spans}
         
     except Exception as e:
         print(f"Error in query: {e}")
@@ -95,11 +290,145 @@ async def ask_question(request: QueryRequest):
             content={"status": "error", "message": str(e)}
         )
 
+# --- Streaming helpers ---
+def sse_event(event: str, data) -> str:
+    """Formats a single Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def iterate_in_thread(generator, context: contextvars.Context | None = None, executor=None):
+    """
+    Pulls items from a blocking generator on `executor` (asyncio's default one if None),
+    closing it when abandoned. With `context`, the generator runs inside it (e.g. to keep
+    recording a request's spans); otherwise inside a copy of the caller's context.
+    """
+    sentinel = object()
+    run = (context or contextvars.copy_context()).run
+    # A generator cannot be closed while next() runs on it, so the close waits its turn
+    in_use = threading.Lock()
+
+    def pull():
+        with in_use:
+            return run(next, generator, sentinel)
+
+    def close():
+        with in_use:
+            try:
+                run(generator.close)
+            except Exception as e:
+                print(f"Error closing a streamed generator: {e}")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while (item := await loop.run_in_executor(executor, pull)) is not sentinel:
+            yield item
+    finally:
+        # Not awaited: after a disconnect, the pull in flight may take a while to return
+        loop.run_in_executor(executor, close)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.post("/api/ask-question/stream")
+async def ask_question_stream(request: QueryRequest, http_request: Request):
+    """Streams the retrieved contexts first, then the answer tokens as Groq produces them."""
+    if error := invalid_video_id(request.video_id):
+        return error
+    try:
+        report = {}
+        with collect_spans() as spans:
+            index = await asyncio.to_thread(get_vector_index)
+            answer_stream, contexts = await asyncio.to_thread(
+                query_video, index, request.query, request.video_id, report=report
+            )
+            # The answer is generated after this handler returns; keep its spans with the request
+            request_context = contextvars.copy_context()
+    except Exception as e:
+        print(f"Error in query: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"status": "error", "message": str(e)}
+        )
+
+    async def event_stream():
+        yield sse_event("contexts", contexts)
+        if "context_packing" in report:
+            yield sse_event("context_packing", report["context_packing"])
+        tokens = iterate_in_thread(answer_stream, request_context, answer_executor)
+        try:
+            async for token in tokens:
+                if await http_request.is_disconnected():
+                    print("Client disconnected; cancelling the Groq completion.")
+                    return
+                yield sse_event("token", token)
+            yield sse_event("done", {"spans": spans})
+        finally:
+            await tokens.aclose()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# --- Many questions about one video ---
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "50"))
+
+def invalid_batch(request: MultiQueryRequest) -> JSONResponse | None:
+    if not request.queries or len(request.queries) > ASK_BATCH_MAX_QUESTIONS:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": f"Send between 1 and {ASK_BATCH_MAX_QUESTIONS} queries."}
+        )
+    return invalid_video_id(request.video_id)
+
+@app.post("/api/ask-questions")
+async def ask_questions(request: MultiQueryRequest):
+    """Answers every query (embedded together, answered concurrently) and returns them in input order."""
+    if error := invalid_batch(request):
+        return error
+    try:
+        with collect_spans() as spans:
+            index = await asyncio.to_thread(get_vector_index)
+            answered = await run_answering(list, answer_questions(index, request.queries, request.video_id))
+        results = [result for _, result in sorted(answered, key=lambda item: item[0])]
+        return {"results": results, "spans": spans}
+    except Exception as e:
+        print(f"Error in batch query: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"status": "error", "message": str(e)}
+        )
+
+@app.post("/api/ask-questions/stream")
+async def ask_questions_stream(request: MultiQueryRequest, http_request: Request):
+    """Streams a `result` event (with its `index` in the request) as each question is answered."""
+    if error := invalid_batch(request):
+        return error
+    with collect_spans() as spans:
+        request_context = contextvars.copy_context()
+
+    async def event_stream():
+        try:
+            index = await asyncio.to_thread(get_vector_index)
+        except Exception as e:
+            print(f"Error in batch query: {e}")
+            yield sse_event("error", {"message": str(e)})
+            return
+        results = iterate_in_thread(
+            answer_questions(index, request.queries, request.video_id), request_context, answer_executor
+        )
+        try:
+            async for i, result in results:
+                if await http_request.is_disconnected():
+                    print("Client disconnected; dropping the remaining questions.")
+                    return
+                yield sse_event("result", {"index": i, **result})
+            yield sse_event("done", {"spans": spans})
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # --- API Endpoint 3: Generate Blog ---
 @app.post("/api/generate-blog")
 async def generate_blog(request: BlogRequest):
     try:
-        blog_post_md = generate_blog_post(request.transcript_file)
+        blog_post_md = await generate_blog_post_async(request.transcript_file)
         return {"blog_content": blog_post_md}
     except Exception as e:
         return JSONResponse(
@@ -107,4 +436,65 @@ async def generate_blog(request: BlogRequest):
             content={"status": "error", "message": str(e)}
         )
 
+@app.post("/api/generate-blog/stream")
+async def generate_blog_stream(request: BlogRequest, http_request: Request):
+    """Streams map/reduce progress, then the title, outline and each section as it is written."""
+    async def event_stream():
+        events = blog_post_events(request.transcript_file)
+        try:
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    print("Client disconnected; cancelling blog generation.")
+                    return
+                yield sse_event(event, data)
+        except Exception as e:
+            print(f"Error in blog generation: {e}")
+            yield sse_event("error", {"message": str(e)})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# --- API Endpoint 4: Warm Up ---
+WARMUP_COMPONENTS = {
+    "vector_index": get_vector_index,
+    "groq": get_groq_client,
+    "llm": get_llm,
+    "embedding_model": get_embedding_model,
+}
+
+@app.post("/api/warmup")
+async def warmup():
+    """Initializes every lazily-created client and reports how long each took."""
+    timings = {}
+    errors = {}
+    for name, initialize in WARMUP_COMPONENTS.items():
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(initialize)
+        except Exception as e:
+            errors[name] = str(e)
+        timings[name] = round(time.perf_counter() - start, 3)
+    status = "success" if not errors else "error"
+    return JSONResponse(
+        status_code=200 if not errors else 500,
+        content={"status": status, "timings": timings, "errors": errors}
+    )
+
+# --- API Endpoint 5: Metrics ---
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Times every request by route; for streamed responses this is the time to the first byte."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    name = f"http {request.method} {route.path if route else 'unmatched'}"
+    record(name, time.perf_counter() - start, error=response.status_code >= 500)
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of span latencies, errors and counters."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Vercel will use this 'app' object to run the server
\ No newline at end of file
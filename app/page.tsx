@@ -40,6 +40,7 @@ export default function Home() {
   const [error, setError] = useState<string | null>(null);
   const [videoProcessed, setVideoProcessed] = useState(false);
   const [transcriptFilePath, setTranscriptFilePath] = useState<string | null>(null); // To store the path for blog gen
+  const [videoId, setVideoId] = useState<string | null>(null); // Scopes questions to this video's vectors
 
   const [question, setQuestion] = useState("");
   const [isAnswering, setIsAnswering] = useState(false); // For answering questions
@@ -47,6 +48,7 @@ export default function Home() {
 
   const [blogContent, setBlogContent] = useState("");
   const [isGeneratingBlog, setIsGeneratingBlog] = useState(false); // For blog generation
+  const [blogProgress, setBlogProgress] = useState("");
 
   const { toast } = useToast();
 
@@ -64,6 +66,7 @@ export default function Home() {
     setVideoProcessed(false);
     setChatHistory([]); // Clear previous chat
     setTranscriptFilePath(null); // Clear previous transcript path
+    setVideoId(null);
 
     try {
       const response = await fetch("http://localhost:8000/api/process-video", {
@@ -78,12 +81,24 @@ export default function Home() {
         throw new Error(data.message || `HTTP error! status: ${response.status}`);
       }
       
-      if (data.status !== "success") {
-         throw new Error(data.message || "Backend processing failed.");
+      // The backend queues a job; poll it until the pipeline finishes
+      let job = data;
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 3000));
+        const jobResponse = await fetch(`http://localhost:8000/api/jobs/${data.job_id}`);
+        job = await jobResponse.json();
+        if (!jobResponse.ok) {
+          throw new Error(job.message || `HTTP error! status: ${jobResponse.status}`);
+        }
+      }
+
+      if (job.status !== "completed") {
+         throw new Error(job.error || "Backend processing failed.");
       }
 
       setVideoProcessed(true);
-      setTranscriptFilePath(data.transcript_file); // Store the path
+      setTranscriptFilePath(job.result.transcript_file); // Store the path
+      setVideoId(job.result.video_id);
       toast({
         title: "Success!",
         description: "Video processed. You can now ask questions or generate a blog post.",
@@ -114,19 +129,37 @@ export default function Home() {
     setQuestion(""); 
 
     try {
-      const response = await fetch("http://localhost:8000/api/ask-question", {
+      const response = await fetch("http://localhost:8000/api/ask-question/stream", {
         method: "POST",
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query: currentQuestion }), // Use captured question
+        body: JSON.stringify({ query: currentQuestion, video_id: videoId ?? "" }), // Use captured question
       });
-      
-      const data = await response.json();
-       if (!response.ok) {
-        throw new Error(data.answer || `HTTP error! status: ${response.status}`);
+
+       if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.message || `HTTP error! status: ${response.status}`);
+      }
+
+      // Render the answer progressively as Server-Sent Events arrive
+      setChatHistory((prev) => [...prev, { role: "ai", content: "" }]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let answer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const rawEvent of events) {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const payload = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (eventName !== "token" || payload === undefined) continue;
+          answer += JSON.parse(payload);
+          setChatHistory((prev) => [...prev.slice(0, -1), { role: "ai", content: answer }]);
+        }
       }
-      
-      const aiMessage: Message = { role: "ai", content: data.answer };
-      setChatHistory((prev) => [...prev, aiMessage]);
 
     } catch (err: any) {
        console.error("Answering Error:", err);
@@ -155,21 +188,56 @@ export default function Home() {
      }
     setIsGeneratingBlog(true);
     setBlogContent("");
+    setBlogProgress("Starting...");
     setError(null);
 
     try {
-      const response = await fetch("http://localhost:8000/api/generate-blog", {
+      const response = await fetch("http://localhost:8000/api/generate-blog/stream", {
          method: "POST",
          headers: { 'Content-Type': 'application/json' },
          body: JSON.stringify({ transcript_file: transcriptFilePath }), // Send the path
       });
-      const data = await response.json();
 
-      if (!response.ok) {
-        throw new Error(data.blog_content || `HTTP error! status: ${response.status}`);
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.message || `HTTP error! status: ${response.status}`);
+      }
+
+      // Render the post progressively: title, then sections in outline order as they finish
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let title = "";
+      const sections: string[] = [];
+      const render = () => setBlogContent([title && `# ${title}`, ...sections.filter(Boolean)].filter(Boolean).join("\n\n"));
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const rawEvent of events) {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const payload = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (!eventName || payload === undefined) continue;
+          const data = JSON.parse(payload);
+          if (eventName === "progress") {
+            setBlogProgress(data.stage === "map" ? `Summarizing transcript (${data.completed}/${data.total})...` : "Condensing summary...");
+          } else if (eventName === "title") {
+            title = data;
+            setBlogProgress("Writing sections...");
+            render();
+          } else if (eventName === "section") {
+            sections[data.index] = data.markdown;
+            render();
+          } else if (eventName === "done") {
+            setBlogContent(data.blog_content);
+          } else if (eventName === "error") {
+            throw new Error(data.message);
+          }
+        }
       }
 
-      setBlogContent(data.blog_content);
        toast({
         title: "Blog Post Generated!",
         description: "The blog post has been created successfully.",
@@ -322,10 +390,10 @@ export default function Home() {
                       </SheetDescription>
                     </SheetHeader>
                     <div className="prose dark:prose-invert py-4 max-h-[80vh] overflow-y-auto mt-4 border-t dark:border-gray-700 pt-4">
-                      {isGeneratingBlog ? (
+                      {isGeneratingBlog && !blogContent ? (
                         <div className="flex items-center justify-center p-8">
                           <Loader2 className="h-8 w-8 animate-spin text-muted-foreground" />
-                          <p className="ml-4">Generating...</p>
+                          <p className="ml-4">{blogProgress || "Generating..."}</p>
                         </div>
                       ) : (
                         // Use pre-wrap to respect newlines from the markdown
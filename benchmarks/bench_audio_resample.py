@@ -0,0 +1,75 @@
+# bench_audio_resample.py
+#
+# Compares wall time and peak RSS of the 16 kHz conversion paths on a long synthetic input:
+#   legacy  - ffmpeg -> 44.1 kHz MP3, then pydub decodes it in memory, resamples and re-encodes
+#   ffmpeg  - convert_to_16Khz, a single streaming ffmpeg pass
+#
+#   python -m benchmarks.bench_audio_resample --minutes 120
+#
+# Each path runs in its own child process; peak RSS covers that process and its ffmpeg children.
+# Requires ffmpeg on PATH (and pydub for the legacy path).
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+def make_input(path: str, minutes: float):
+    """Writes a stereo 44.1 kHz Opus file of band-limited noise, like a typical YouTube download."""
+    subprocess.run(
+        ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"anoisesrc=color=pink:sample_rate=44100:duration={minutes * 60}",
+         "-ac", "2", "-c:a", "libopus", "-b:a", "96k", path],
+        check=True,
+    )
+
+def run_legacy(source: str, workdir: str):
+    from pydub import AudioSegment
+    mp3_path = os.path.join(workdir, "audio.mp3")
+    subprocess.run(["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-i", source, "-vn", mp3_path], check=True)
+    audio = AudioSegment.from_mp3(mp3_path)
+    audio = audio.set_frame_rate(16000)
+    audio.export(os.path.join(workdir, "audio_16Khz.mp3"), format="mp3")
+
+def run_ffmpeg(source: str, workdir: str):
+    from python_helpers.yt_downloader import convert_to_16Khz
+    convert_to_16Khz(source, os.path.join(workdir, "audio_16Khz.mp3"))
+
+PATHS = {"legacy": run_legacy, "ffmpeg": run_ffmpeg}
+
+def measure(name: str, source: str, workdir: str):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_audio_resample", "--run", name, source, workdir],
+        capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        print(f"{name:<8} failed: {result.stderr.strip().splitlines()[-1] if result.stderr else result.returncode}")
+        return
+    # ru_maxrss is in KB on Linux; the child prints its own peak and its children's
+    peak_kb = max(int(value) for value in result.stdout.split())
+    print(f"{name:<8} {elapsed:8.2f} s {peak_kb / 1024:10.1f} MB peak RSS")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--run", nargs=3, metavar=("PATH", "SOURCE", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        name, source, workdir = args.run
+        PATHS[name](source, workdir)
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "source.opus")
+        make_input(source, args.minutes)
+        print(f"{args.minutes:g} min input, {os.path.getsize(source) / 1024**2:.1f} MB")
+        for name in PATHS:
+            measure(name, source, workdir)
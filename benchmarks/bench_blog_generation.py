@@ -0,0 +1,73 @@
+# bench_blog_generation.py
+#
+# Wall time of blog generation against FakeLLM, no API key needed:
+#   serial      - the previous flow: one call at a time, 2 s sleep after each section
+#   concurrent  - generate_blog_post_async through the shared token-bucket limiter
+#
+#   python -m benchmarks.bench_blog_generation --chars 60000 --latency 0.8 --server-rpm 30
+#
+# --server-rpm makes the fake answer 429 past that many requests a minute; the limiter
+# is configured from --rpm/--tpm so the two can be set to disagree.
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from benchmarks.fake_llm import FakeLLM
+from python_helpers.rate_limit import RateLimiter
+from python_helpers.blog_generation import (
+    generate_blog_post_async, summary_prompt, blog_prompts, section_prompt, parse_headings,
+)
+
+SENTENCE = "Today we are looking at how small teams ship reliable software without burning out. "
+
+def run_serial(transcript_text: str, llm: FakeLLM, sleep: float = 2.0):
+    from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
+
+    chunks = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200).split_text(transcript_text)
+    summaries = [llm.invoke(summary_prompt(chunk)).content for chunk in chunks]
+    condensed_context = llm.invoke(summary_prompt("\n\n".join(summaries))).content
+    prompts = blog_prompts(condensed_context)
+    llm.invoke(prompts["title"])
+    headings = parse_headings(llm.invoke(prompts["outline"]).content)
+    for heading in headings:
+        llm.invoke(section_prompt(heading, condensed_context))
+        time.sleep(sleep)
+    llm.invoke(prompts["summary"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=30000, help="transcript length")
+    parser.add_argument("--latency", type=float, default=0.8, help="seconds per fake LLM call")
+    parser.add_argument("--server-rpm", type=float, default=None, help="fake server's own request limit")
+    parser.add_argument("--rpm", type=float, default=30)
+    parser.add_argument("--tpm", type=float, default=60000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        transcript_text = SENTENCE * (args.chars // len(SENTENCE))
+        json.dump({"transcript": transcript_text}, f)
+        transcript_file = f.name
+
+    print(f"{len(transcript_text)} chars, {args.latency}s per call")
+    runs = {
+        "serial": lambda llm: run_serial(transcript_text, llm),
+        "concurrent": lambda llm: asyncio.run(
+            generate_blog_post_async(transcript_file, llm=llm, limiter=RateLimiter(args.rpm, args.tpm))
+        ),
+    }
+    for name, run in runs.items():
+        llm = FakeLLM(args.latency, args.server_rpm)
+        start = time.perf_counter()
+        try:
+            run(llm)
+            outcome = "ok"
+        except Exception as e:
+            # The serial flow never retried, so a 429 fails the whole post
+            outcome = f"failed: {e}"
+        print(f"{name:<11} {time.perf_counter() - start:7.2f}s  {llm.calls:3} calls  "
+              f"{llm.rate_limited} rate-limited  {outcome}")
+    os.remove(transcript_file)
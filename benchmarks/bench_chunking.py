@@ -0,0 +1,114 @@
+# bench_chunking.py
+#
+# Compares one-vector-per-entry ingest against windowed chunking on a transcript:
+# vector count, embed + upsert time into a LocalVectorIndex, and retrieval hit rate.
+#
+#   python -m benchmarks.bench_chunking                              # synthetic transcript, hashed embedder
+#   python -m benchmarks.bench_chunking --transcript transcript.json --model
+#
+# Queries are built from sampled entries (a random half of their words); a query is a
+# hit when one of the top-k results covers the sampled entry's start time. The default
+# hashed bag-of-words embedder keeps the run offline; --model uses the real one.
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+
+import numpy as np
+
+from python_helpers.chunking import chunk_entries
+from python_helpers.vector_index import LocalVectorIndex
+
+TOPICS = [
+    "pricing subscription revenue customers churn discount annual plan",
+    "training dataset labels validation overfitting epochs learning rate",
+    "kubernetes cluster pods deployment scaling nodes container registry",
+    "recipe flour butter oven minutes dough sugar bake",
+    "football match goal striker defence penalty referee league",
+    "telescope galaxy orbit planet gravity light years nebula",
+]
+FILLER = "so um you know like basically I mean right okay yeah well actually".split()
+
+def make_transcript(entries: int, seed: int = 0) -> list[dict]:
+    """Short diarized utterances drifting between topics, like a conversational video."""
+    rng = random.Random(seed)
+    result = []
+    clock = 0.0
+    topic = rng.choice(TOPICS).split()
+    for i in range(entries):
+        if i % 40 == 0:
+            topic = rng.choice(TOPICS).split()
+        words = rng.sample(topic, 3) + rng.sample(FILLER, rng.randint(2, 6)) + [f"item{i}"]
+        rng.shuffle(words)
+        duration = len(words) * 0.4
+        result.append({"transcript": " ".join(words), "speaker_id": str(i // 7 % 2),
+                       "start_time_seconds": round(clock, 2), "end_time_seconds": round(clock + duration, 2)})
+        clock += duration + 0.3
+    return result
+
+def hashed_embedder(dimension: int = 384):
+    def encode(texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                matrix[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % dimension] += 1.0
+        return matrix
+    return encode
+
+def run(name: str, entries: list[dict], chunks: list[dict], encode, queries, top_k: int):
+    with tempfile.TemporaryDirectory() as root:
+        index = LocalVectorIndex(root)
+        start = time.perf_counter()
+        vectors = encode([chunk["transcript"] for chunk in chunks])
+        index.upsert(vectors=[
+            {"id": str(i), "values": row, "metadata": {"start": c["start_time_seconds"], "end": c["end_time_seconds"]}}
+            for i, (c, row) in enumerate(zip(chunks, vectors))
+        ], namespace="bench")
+        ingest_seconds = time.perf_counter() - start
+
+        query_vectors = encode([text for text, _ in queries])
+        hits = 0
+        start = time.perf_counter()
+        for vector, (_, at) in zip(query_vectors, queries):
+            matches = index.query(vector=vector, top_k=top_k, namespace="bench")["matches"]
+            hits += any(m["metadata"]["start"] <= at <= m["metadata"]["end"] for m in matches)
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"{name:<22} {len(chunks):>8} {ingest_seconds:9.2f}s {query_ms:9.2f}ms {hits / len(queries):9.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcript", help="a Sarvam transcript.json to use instead of synthetic data")
+    parser.add_argument("--entries", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--model", action="store_true", help="use the real sentence-transformer")
+    args = parser.parse_args()
+
+    if args.transcript:
+        with open(args.transcript, "r") as f:
+            entries = json.load(f)["diarized_transcript"]["entries"]
+    else:
+        entries = make_transcript(args.entries)
+
+    if args.model:
+        from python_helpers.embedding_service import encode_texts as encode
+    else:
+        encode = hashed_embedder()
+
+    rng = random.Random(1)
+    queries = []
+    for entry in rng.sample(entries, min(args.queries, len(entries))):
+        words = entry["transcript"].split()
+        queries.append((" ".join(rng.sample(words, max(1, len(words) // 2))), entry["start_time_seconds"]))
+
+    print(f"{len(entries)} entries, {len(queries)} queries, top {args.top_k}")
+    print(f"{'strategy':<22} {'vectors':>8} {'ingest':>10} {'query':>11} {'hit rate':>9}")
+    run("per-entry", entries, chunk_entries(entries, max_tokens=0), encode, queries, args.top_k)
+    for max_tokens, overlap in ((80, 0), (160, 0), (160, 1), (320, 1)):
+        chunks = chunk_entries(entries, max_tokens=max_tokens, max_seconds=float("inf"), overlap_entries=overlap)
+        run(f"window {max_tokens} tok +{overlap}", entries, chunks, encode, queries, args.top_k)
+    chunks = chunk_entries(entries, max_tokens=160, max_seconds=float("inf"), overlap_entries=0, split_on_speaker=True)
+    run("window 160 by speaker", entries, chunks, encode, queries, args.top_k)
@@ -0,0 +1,63 @@
+# bench_cold_start.py
+#
+# Measures how long a fresh interpreter takes to import each backend module, which is
+# what a serverless cold start pays before the first request can be served:
+#
+#   python -m benchmarks.bench_cold_start --repeat 3
+#   python -m benchmarks.bench_cold_start --importtime api.index   # top 15 slowest imports
+#
+# Every sample runs in its own child process, so nothing is already in sys.modules.
+
+import sys
+import argparse
+import statistics
+import subprocess
+
+MODULES = [
+    "python_helpers.yt_downloader",
+    "python_helpers.audio_transcribe",
+    "python_helpers.embedding_service",
+    "python_helpers.embed_text",
+    "python_helpers.rag",
+    "python_helpers.blog_generation",
+    "api.index",
+]
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+def import_seconds(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(module: str, limit: int = 15) -> list[tuple[int, str]]:
+    """Parses `python -X importtime` output into (cumulative_us, package) pairs."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--importtime", metavar="MODULE", help="show the slowest imports of one module")
+    args = parser.parse_args()
+
+    if args.importtime:
+        for cumulative, name in slowest_imports(args.importtime):
+            print(f"{cumulative / 1000:10.1f} ms  {name}")
+        sys.exit(0)
+
+    print(f"{'module':<36} {'median':>10} {'max':>10}")
+    for module in MODULES:
+        samples = [import_seconds(module) for _ in range(args.repeat)]
+        print(f"{module:<36} {statistics.median(samples) * 1000:8.0f} ms {max(samples) * 1000:8.0f} ms")
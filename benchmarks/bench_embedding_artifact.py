@@ -0,0 +1,85 @@
+# bench_embedding_artifact.py
+#
+# Compares the embedding artifact formats on a synthetic transcript:
+#   json-inline  - the old format, embeddings as float lists inside indented transcript JSON
+#   npy-float32  - slim transcript JSON plus a memory-mappable float32 .npy sidecar
+#   npy-float16  - the same with a float16 sidecar (EMBED_STORE_DTYPE=float16)
+#
+#   python -m benchmarks.bench_embedding_artifact --entries 20000
+#
+# "read" is what load_and_upsert_data pays before it can hand rows to the index.
+
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+def make_transcript(entries: int) -> dict:
+    return {
+        "transcript": "",
+        "diarized_transcript": {"entries": [
+            {"transcript": f"Sentence number {i} of the synthetic transcript.", "speaker_id": str(i % 3),
+             "start_time_seconds": i * 2.0, "end_time_seconds": i * 2.0 + 1.8}
+            for i in range(entries)
+        ]},
+    }
+
+def write_inline(path: str, transcript: dict, embeddings: np.ndarray):
+    entries = transcript["diarized_transcript"]["entries"]
+    inline = {**transcript, "diarized_transcript": {"entries": [
+        {**entry, "embedding": row} for entry, row in zip(entries, embeddings.tolist())
+    ]}}
+    with open(path, "w") as f:
+        json.dump(inline, f, indent=2)
+
+def read_inline(path: str) -> int:
+    with open(path, "r") as f:
+        data = json.load(f)
+    return sum(len(entry["embedding"]) for entry in data["diarized_transcript"]["entries"])
+
+def make_npy_format(dtype: str):
+    def write(path: str, transcript: dict, embeddings: np.ndarray):
+        np.save(path + ".npy", embeddings.astype(dtype))
+        with open(path, "w") as f:
+            json.dump(transcript, f)
+
+    def read(path: str) -> int:
+        with open(path, "r") as f:
+            json.load(f)
+        matrix = np.load(path + ".npy", mmap_mode="r")
+        return matrix.shape[0] * matrix.shape[1]
+    return write, read
+
+FORMATS = {
+    "json-inline": (write_inline, read_inline),
+    "npy-float32": make_npy_format("float32"),
+    "npy-float16": make_npy_format("float16"),
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    transcript = make_transcript(args.entries)
+    embeddings = np.random.default_rng(0).standard_normal((args.entries, args.dimension)).astype(np.float32)
+
+    print(f"{args.entries} entries x {args.dimension} dims")
+    print(f"{'format':<12} {'write':>9} {'read':>9} {'size':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (write, read) in FORMATS.items():
+            path = os.path.join(workdir, f"{name}.json")
+            start = time.perf_counter()
+            write(path, transcript, embeddings)
+            write_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            read(path)
+            read_seconds = time.perf_counter() - start
+
+            size = sum(os.path.getsize(p) for p in (path, path + ".npy") if os.path.exists(p))
+            print(f"{name:<12} {write_seconds:8.2f}s {read_seconds:8.2f}s {size / 1024**2:8.1f} MB")
@@ -0,0 +1,402 @@
+# bench_end_to_end.py
+#
+# Drives the API in-process under concurrent load with every external service faked,
+# so it runs offline and needs no keys:
+#   yt-dlp        - writes a dummy audio file after --download-ms
+#   Sarvam        - fake job API + local storage (benchmarks.fake_sarvam)
+#   Pinecone      - the local NumPy index, plus --index-ms per call
+#   embeddings    - hashed bag-of-words vectors, --encode-ms per text (--model for the real one)
+#   Groq          - FakeGroqClient for answers, FakeLLM for the blog (benchmarks.fake_llm)
+#
+#   python -m benchmarks.bench_end_to_end --videos 8 --questions 200 --blogs 4 --concurrency 8
+#   python -m benchmarks.bench_end_to_end --save baseline.json
+#   python -m benchmarks.bench_end_to_end --baseline baseline.json --tolerance 0.25
+#
+# For each endpoint it reports throughput, p50/p99 latency and the peak Python heap while
+# that endpoint was under load. Under load, pipeline stages (and the spans of the question
+# endpoints) overlap, so their rows carry latencies and mark throughput and heap "n/a".
+# A serial pass then runs --serial-videos fresh videos one at a time, tracing each stage on
+# its own: its "(serial)" rows give videos per stage-second and the stage's peak heap.
+# With --baseline, it exits non-zero if any row's p99 or throughput is worse than the
+# baseline by more than --tolerance.
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+from benchmarks.bench_chunking import make_transcript, hashed_embedder, TOPICS
+from python_helpers.vector_index import LocalVectorIndex
+
+STAGES = ["download", "transcribe", "embed", "upsert"]
+
+# --- 1. FAKES ---
+
+def configure_environment(workdir: str, args):
+    """Settings the app reads at import time; must run before api.index is imported."""
+    os.environ.update({
+        "VECTOR_INDEX_BACKEND": "local",
+        "EMBED_WARMUP": "false",
+        "LEXICAL_INDEX_DIR": os.path.join(workdir, "lexical_index"),
+        "ARTIFACT_CACHE_DIR": os.path.join(workdir, "artifacts"),
+        "JOBS_ROOT": os.path.join(workdir, "jobs"),
+        "EMBED_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3"),
+        "SUMMARY_CACHE_PATH": os.path.join(workdir, "summaries.sqlite3"),
+        "ANSWER_CACHE": "true" if args.answer_cache else "false",
+        "GROQ_REQUESTS_PER_MINUTE": str(args.rpm),
+        "GROQ_TOKENS_PER_MINUTE": str(args.tpm),
+        "SARVAM_API_KEY": "fake",
+        "GROQ_API_KEY": "fake",
+    })
+    if args.jobs:
+        os.environ["MAX_CONCURRENT_JOBS"] = str(args.jobs)
+
+class HashedModel:
+    """Stands in for the SentenceTransformer: `encode` costs `seconds_per_text` per text."""
+
+    def __init__(self, seconds_per_text: float):
+        self.seconds_per_text = seconds_per_text
+        self.encode_texts = hashed_embedder(384)
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        time.sleep(self.seconds_per_text * len(texts))
+        return self.encode_texts(list(texts))
+
+def delayed_index(index, latency: float):
+    """Adds a network round trip to every call the pipeline makes on the local index."""
+    for name in ("upsert", "query", "delete", "describe_index_stats"):
+        method = getattr(index, name)
+        def call(*args, _method=method, **kwargs):
+            time.sleep(latency)
+            return _method(*args, **kwargs)
+        setattr(index, name, call)
+    return index
+
+def transcript_for(job_id: str, entries: int) -> dict:
+    entries = make_transcript(entries, seed=int(job_id[:8], 16))
+    return {
+        "transcript": " ".join(entry["transcript"] for entry in entries),
+        "diarized_transcript": {"entries": entries},
+    }
+
+def install_fakes(app_module, workdir: str, args) -> dict:
+    from python_helpers import rag, blog_generation, embedding_service
+    from benchmarks.fake_llm import FakeLLM, FakeGroqClient
+    from benchmarks.fake_sarvam import FakeSarvamAPI, install_fake_storage
+
+    def download_audio(url, output_dir="."):
+        time.sleep(args.download_ms / 1000)
+        path = os.path.join(output_dir, "audio_16Khz.mp3")
+        with open(path, "wb") as f:
+            f.write(os.urandom(args.audio_kb * 1024))
+        return path
+
+    storage_root = os.path.join(workdir, "sarvam")
+    sarvam = FakeSarvamAPI(storage_root, lambda job_id: transcript_for(job_id, args.entries),
+                           latency=args.sarvam_ms / 1000, processing=args.processing_ms / 1000,
+                           requests_per_second=args.sarvam_rps)
+    sarvam.install()
+    install_fake_storage(storage_root, latency=args.storage_ms / 1000)
+
+    app_module.download_audio_from_url = download_audio
+    index = delayed_index(LocalVectorIndex(os.path.join(workdir, "local_index"), dimension=rag.MODEL_DIMENSION),
+                          args.index_ms / 1000)
+    app_module.get_vector_index = lambda: index
+    if not args.model:
+        embedding_service._model = HashedModel(args.encode_ms / 1000)
+    groq = FakeGroqClient(ttft=args.ttft_ms / 1000, tokens=args.answer_tokens)
+    rag.get_groq_client = lambda: groq
+    blog_llm = FakeLLM(args.llm_ms / 1000, args.server_rpm)
+    blog_generation.get_llm = lambda: blog_llm
+    return {"sarvam": sarvam, "groq": groq, "blog_llm": blog_llm}
+
+# --- 2. LOAD GENERATION ---
+
+class Phase:
+    """Latencies, errors and peak heap for one endpoint under load."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.wall = 0.0
+        self.peak_bytes = 0
+        self.stages = {}  # sub-stage name -> latencies
+
+    @staticmethod
+    def row(name: str, latencies: list[float], errors: int = 0) -> dict:
+        return {
+            "name": name,
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput": None,
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 1) if latencies else None,
+            "peak_mb": None,
+        }
+
+    def rows(self) -> list[dict]:
+        """The endpoint's row, then a latency-only row per sub-stage (they overlap under load)."""
+        endpoint = self.row(self.name, self.latencies, self.errors)
+        endpoint["throughput"] = round(len(self.latencies) / self.wall, 3) if self.wall else 0.0
+        endpoint["peak_mb"] = round(self.peak_bytes / 1024**2, 1)
+        return [endpoint] + [
+            self.row(f"{self.name}.{stage}", latencies) for stage, latencies in self.stages.items()
+        ]
+
+async def run_phase(phase: Phase, requests: list, concurrency: int):
+    """Runs the request coroutine factories `concurrency` at a time, timing each one."""
+    queue = list(reversed(requests))
+
+    async def worker():
+        while queue:
+            request = queue.pop()
+            start = time.perf_counter()
+            try:
+                stages = await request()
+            except Exception as e:
+                phase.errors += 1
+                print(f"  {phase.name} failed: {e}")
+                continue
+            phase.latencies.append(time.perf_counter() - start)
+            for stage, seconds in (stages or {}).items():
+                phase.stages.setdefault(stage, []).append(seconds)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    phase.wall = time.perf_counter() - start
+    phase.peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+@contextmanager
+def traced_stages(peaks: dict):
+    """
+    Runs every pipeline stage under its own tracemalloc session and appends its peak heap
+    to `peaks[stage]`. Only meaningful while one job runs at a time.
+    """
+    from python_helpers.jobs import Job
+    track = Job.track
+
+    @contextmanager
+    def traced(self, stage: str):
+        tracemalloc.start()
+        try:
+            with track(self, stage):
+                yield
+            peaks.setdefault(stage, []).append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    Job.track = traced
+    try:
+        yield peaks
+    finally:
+        Job.track = track
+
+async def run_serial_stages(name: str, requests: list) -> list[dict]:
+    """Runs the process-video requests one at a time and returns a row per traced stage."""
+    stages = {}
+    errors = 0
+    with traced_stages({}) as peaks:
+        for request in requests:
+            try:
+                for stage, seconds in (await request() or {}).items():
+                    stages.setdefault(stage, []).append(seconds)
+            except Exception as e:
+                errors += 1
+                print(f"  {name} (serial) failed: {e}")
+    rows = []
+    for stage, latencies in stages.items():
+        row = Phase.row(f"{name}.{stage} (serial)", latencies, errors)
+        row["throughput"] = round(len(latencies) / sum(latencies), 3) if sum(latencies) else 0.0
+        row["peak_mb"] = round(max(peaks.get(stage, [0])) / 1024**2, 1)
+        rows.append(row)
+    return rows
+
+def process_video_request(client, url: str, results: list):
+    async def request():
+        response = await client.post("/api/process-video", json={"url": url})
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        results.append(job["result"])
+        return {stage: job["timings"][stage] for stage in STAGES if stage in job["timings"]}
+    return request
+
+def ask_question_request(client, query: str, video_id: str):
+    async def request():
+        response = await client.post("/api/ask-question", json={"query": query, "video_id": video_id})
+        response.raise_for_status()
+        spans = response.json().get("spans", {})
+        return {name: spans[name]["seconds"] for name in ("groq.ttft", "index.query") if name in spans}
+    return request
+
+def ask_questions_request(client, queries: list[str], video_id: str):
+    async def request():
+        response = await client.post("/api/ask-questions", json={"queries": queries, "video_id": video_id})
+        response.raise_for_status()
+        body = response.json()
+        if errors := [result["error"] for result in body["results"] if "error" in result]:
+            raise RuntimeError(errors[0])
+        spans = body.get("spans", {})
+        return {name: spans[name]["seconds"] for name in ("query.embed_batch",) if name in spans}
+    return request
+
+def generate_blog_request(client, transcript_file: str):
+    async def request():
+        response = await client.post("/api/generate-blog", json={"transcript_file": transcript_file})
+        response.raise_for_status()
+    return request
+
+# --- 3. REPORTING ---
+
+def print_rows(rows: list[dict]):
+    print(f"\n{'':<34}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>9}")
+    def cell(value, missing: str = "-") -> str:
+        return missing if value is None else f"{value:.1f}"
+
+    for row in rows:
+        throughput = "n/a" if row["throughput"] is None else f"{row['throughput']:.2f}"
+        print(f"{row['name']:<34}{row['requests']:>9}{row['errors']:>8}{throughput:>9}"
+              f"{cell(row['p50_ms']):>10}{cell(row['p99_ms']):>10}{cell(row['peak_mb'], 'n/a'):>9}")
+    if any(row["throughput"] is None for row in rows):
+        print("n/a: stages overlap under load, so the phase's wall time and heap are not theirs;"
+              " see the (serial) rows")
+
+def regressions(rows: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Rows whose p99 rose, or throughput fell, by more than `tolerance` versus the baseline."""
+    previous = {row["name"]: row for row in baseline}
+    found = []
+    for row in rows:
+        before = previous.get(row["name"])
+        if not before:
+            continue
+        if row["p99_ms"] and before["p99_ms"] and row["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            found.append(f"{row['name']}: p99 {before['p99_ms']:.1f} -> {row['p99_ms']:.1f} ms")
+        throughput = row["throughput"]
+        if before["throughput"] and throughput is not None and throughput < before["throughput"] * (1 - tolerance):
+            found.append(f"{row['name']}: throughput {before['throughput']:.2f} -> {row['throughput']:.2f} req/s")
+        if row["errors"] > before["errors"]:
+            found.append(f"{row['name']}: errors {before['errors']} -> {row['errors']}")
+    return found
+
+# --- 4. MAIN ---
+
+async def main(args, workdir: str) -> list[dict]:
+    import httpx
+    import api.index as app_module
+
+    fakes = install_fakes(app_module, workdir, args)
+    rng = random.Random(0)
+    rows = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = []
+        process = Phase("process-video")
+        await run_phase(process, [
+            process_video_request(client, f"https://www.youtube.com/watch?v=bench{i:06d}", results)
+            for i in range(args.videos)
+        ], args.concurrency)
+        rows += process.rows()
+        if args.serial_videos:
+            rows += await run_serial_stages("process-video", [
+                process_video_request(client, f"https://www.youtube.com/watch?v=serial{i:05d}", [])
+                for i in range(args.serial_videos)
+            ])
+        if not results:
+            print("No video was processed; skipping the question and blog phases.")
+            return rows
+
+        ask = Phase("ask-question")
+        await run_phase(ask, [
+            ask_question_request(client, " ".join(rng.sample(rng.choice(TOPICS).split(), 4)),
+                                 rng.choice(results)["video_id"])
+            for _ in range(args.questions)
+        ], args.concurrency)
+        rows += ask.rows()
+
+        ask_many = Phase("ask-questions")
+        await run_phase(ask_many, [
+            ask_questions_request(client, [" ".join(rng.sample(rng.choice(TOPICS).split(), 4))
+                                           for _ in range(args.batch_size)],
+                                  rng.choice(results)["video_id"])
+            for _ in range(args.question_batches)
+        ], args.concurrency)
+        rows += ask_many.rows()
+
+        blog = Phase("generate-blog")
+        await run_phase(blog, [
+            generate_blog_request(client, results[i % len(results)]["transcript_file"])
+            for i in range(args.blogs)
+        ], args.concurrency)
+        rows += blog.rows()
+
+    print(f"\nSarvam: {fakes['sarvam'].requests} requests, {fakes['sarvam'].rate_limited} rate-limited; "
+          f"Groq answers: {fakes['groq'].calls} calls; blog LLM: {fakes['blog_llm'].calls} calls, "
+          f"{fakes['blog_llm'].rate_limited} rate-limited")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    load = parser.add_argument_group("load")
+    load.add_argument("--videos", type=int, default=8)
+    load.add_argument("--questions", type=int, default=100)
+    load.add_argument("--question-batches", type=int, default=4, help="/api/ask-questions requests")
+    load.add_argument("--batch-size", type=int, default=10, help="questions per /api/ask-questions request")
+    load.add_argument("--blogs", type=int, default=2)
+    load.add_argument("--concurrency", type=int, default=8, help="requests in flight per endpoint")
+    load.add_argument("--serial-videos", type=int, default=2, help="videos run one at a time to trace each stage")
+    load.add_argument("--jobs", type=int, default=None, help="MAX_CONCURRENT_JOBS (default: the app's)")
+    load.add_argument("--entries", type=int, default=600, help="transcript entries per video")
+    load.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    fakes = parser.add_argument_group("fake services")
+    fakes.add_argument("--download-ms", type=float, default=200)
+    fakes.add_argument("--audio-kb", type=int, default=512)
+    fakes.add_argument("--sarvam-ms", type=float, default=20, help="latency per Sarvam API call")
+    fakes.add_argument("--sarvam-rps", type=float, default=None, help="Sarvam requests/s before 429s")
+    fakes.add_argument("--processing-ms", type=float, default=1000, help="Sarvam job run time")
+    fakes.add_argument("--storage-ms", type=float, default=10, help="latency per storage call")
+    fakes.add_argument("--index-ms", type=float, default=15, help="latency per vector index call")
+    fakes.add_argument("--encode-ms", type=float, default=0.5, help="embedding time per text")
+    fakes.add_argument("--model", action="store_true", help="use the real embedding model")
+    fakes.add_argument("--ttft-ms", type=float, default=300, help="Groq time to first token")
+    fakes.add_argument("--answer-tokens", type=int, default=60)
+    fakes.add_argument("--llm-ms", type=float, default=500, help="latency per blog LLM call")
+    fakes.add_argument("--server-rpm", type=float, default=None, help="blog LLM requests/min before 429s")
+    fakes.add_argument("--rpm", type=float, default=600, help="GROQ_REQUESTS_PER_MINUTE for the limiter")
+    fakes.add_argument("--tpm", type=float, default=600000, help="GROQ_TOKENS_PER_MINUTE for the limiter")
+    output = parser.add_argument_group("output")
+    output.add_argument("--save", help="write the results as JSON")
+    output.add_argument("--baseline", help="compare against results saved with --save")
+    output.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, args)
+        rows = asyncio.run(main(args, workdir))
+    print_rows(rows)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(rows, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(rows, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if found else 0)
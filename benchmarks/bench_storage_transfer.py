@@ -0,0 +1,150 @@
+# bench_storage_transfer.py
+#
+# Compares peak memory and throughput of SarvamClient storage transfers against the
+# previous whole-file read/readall approach, using a local stand-in for the DataLake
+# directory client that writes to a temp directory. Each storage call costs a fixed
+# latency plus its payload over a per-connection bandwidth.
+#
+#   python -m benchmarks.bench_storage_transfer --size-mb 256 --latency-ms 20 --bandwidth-mbps 50
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+import aiofiles
+
+from python_helpers import audio_transcribe
+from python_helpers.audio_transcribe import SarvamClient
+
+# --- 1. LOCAL STAND-IN FOR THE DATALAKE DIRECTORY CLIENT ---
+
+BANDWIDTH = 50 * 1024**2  # bytes per second per connection, set from --bandwidth-mbps
+
+async def network_delay(latency: float, nbytes: int = 0):
+    await asyncio.sleep(latency + nbytes / BANDWIDTH)
+
+class FakeDownloader:
+    def __init__(self, path: str, chunk_size: int, latency: float):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.latency = latency
+
+    async def readall(self) -> bytes:
+        await network_delay(self.latency, os.path.getsize(self.path))
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    async def chunks(self):
+        with open(self.path, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                await network_delay(self.latency, len(chunk))
+                yield chunk
+
+class FakeFileClient:
+    def __init__(self, path: str, chunk_size: int, latency: float):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.latency = latency
+
+    async def upload_data(self, data, overwrite=True, **kwargs):
+        await network_delay(self.latency, len(data))
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    async def create_file(self, **kwargs):
+        await network_delay(self.latency)
+        open(self.path, "wb").close()
+
+    async def append_data(self, data, offset, length=None, **kwargs):
+        await network_delay(self.latency, len(data))
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, data, offset)
+        finally:
+            os.close(fd)
+
+    async def flush_data(self, offset, **kwargs):
+        await network_delay(self.latency)
+        assert os.path.getsize(self.path) == offset
+
+    async def download_file(self, **kwargs):
+        return FakeDownloader(self.path, self.chunk_size, self.latency)
+
+class FakeDirectoryClient:
+    def __init__(self, root: str, chunk_size: int, latency: float):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get_file_client(self, name: str):
+        return FakeFileClient(os.path.join(self.root, name), self.chunk_size, self.latency)
+
+class LocalSarvamClient(SarvamClient):
+    def __init__(self, root: str, chunk_size: int, latency: float):
+        super().__init__("https://example.blob.core.windows.net/container/dir?sig=x")
+        self.fake_directory = FakeDirectoryClient(root, chunk_size, latency)
+
+    def _directory_client(self):
+        return self.fake_directory
+
+# --- 2. PREVIOUS WHOLE-FILE TRANSFERS ---
+
+async def legacy_upload(directory_client, local_path: str, name: str):
+    async with aiofiles.open(local_path, mode="rb") as file_data:
+        data = await file_data.read()
+        await directory_client.get_file_client(name).upload_data(data, overwrite=True)
+
+async def legacy_download(directory_client, name: str, download_path: str):
+    async with aiofiles.open(download_path, mode="wb") as file_data:
+        stream = await directory_client.get_file_client(name).download_file()
+        await file_data.write(await stream.readall())
+
+# --- 3. BENCHMARK ---
+
+async def measure(label: str, size: int, coroutine):
+    tracemalloc.start()
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<18} {elapsed:8.2f} s {size / elapsed / 1024**2:10.1f} MB/s {peak / 1024**2:10.1f} MB peak")
+
+async def main(size_mb: int, latency_ms: float, bandwidth_mbps: float, chunk_size: int):
+    global BANDWIDTH
+    BANDWIDTH = bandwidth_mbps * 1024**2
+    audio_transcribe.TRANSFER_CHUNK_SIZE = chunk_size
+    latency = latency_ms / 1000
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "audio_16Khz.mp3")
+        with open(source, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        size = os.path.getsize(source)
+        remote = os.path.join(workdir, "remote")
+        os.makedirs(remote)
+        client = LocalSarvamClient(remote, chunk_size, latency)
+
+        print(f"{size_mb} MB file, {latency_ms} ms + {bandwidth_mbps} MB/s per storage call, {chunk_size // 1024} KB chunks")
+        await measure("legacy upload", size, legacy_upload(client.fake_directory, source, "legacy.mp3"))
+        await measure("chunked upload", size, client._upload_file(client.fake_directory, source, "chunked.mp3"))
+        await measure("legacy download", size, legacy_download(client.fake_directory, "legacy.mp3", os.path.join(workdir, "a")))
+        await measure("chunked download", size, client.download_file("chunked.mp3", workdir, "b"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=50.0)
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("SARVAM_TRANSFER_CHUNK_SIZE", str(4 * 1024 * 1024))))
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.latency_ms, args.bandwidth_mbps, args.chunk_size))
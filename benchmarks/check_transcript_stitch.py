@@ -0,0 +1,45 @@
+# check_transcript_stitch.py
+#
+# Stitches the segment transcripts in fixtures/segment_transcripts.json and compares each
+# result with the expected one: timestamps shifted by each segment's offset, segment
+# speaker ids scoped per segment, and a single segment left untouched. Runs offline:
+#
+#   python -m benchmarks.check_transcript_stitch
+#
+# Exits non-zero on any mismatch.
+
+import os
+import sys
+import json
+
+from python_helpers.transcript_stitch import stitch_transcripts
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "segment_transcripts.json")
+
+def differences(actual: dict, expected: dict) -> list[str]:
+    found = [f"{key}: {actual.get(key)!r} != {expected[key]!r}"
+             for key in expected if key != "diarized_transcript" and actual.get(key) != expected[key]]
+    actual_entries = actual["diarized_transcript"]["entries"]
+    expected_entries = expected["diarized_transcript"]["entries"]
+    if len(actual_entries) != len(expected_entries):
+        found.append(f"{len(actual_entries)} entries != {len(expected_entries)}")
+    for i, (got, want) in enumerate(zip(actual_entries, expected_entries)):
+        for key in want:
+            same = abs(got.get(key) - want[key]) < 1e-6 if key.endswith("_seconds") else got.get(key) == want[key]
+            if not same:
+                found.append(f"entry {i} {key}: {got.get(key)!r} != {want[key]!r}")
+    return found
+
+if __name__ == "__main__":
+    with open(FIXTURE) as f:
+        cases = json.load(f)
+
+    failed = 0
+    for name, case in cases.items():
+        parts = [(offset, transcript) for offset, transcript in case["parts"]]
+        found = differences(stitch_transcripts(parts), case["expected"])
+        print(f"{'FAIL' if found else 'ok':<5}{name}")
+        for line in found:
+            print(f"     {line}")
+        failed += bool(found)
+    sys.exit(1 if failed else 0)
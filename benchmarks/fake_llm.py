@@ -0,0 +1,124 @@
+# fake_llm.py
+#
+# Stand-in for ChatGroq: async `ainvoke` with configurable latency that enforces its own
+# requests-per-minute window and answers 429 beyond it, like Groq does.
+
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+
+@dataclass
+class FakeMessage:
+    content: str
+
+class FakeResponse:
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+class FakeRateLimitError(Exception):
+    """Shaped like groq.RateLimitError: a status_code and a response with Retry-After."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit reached (fake)")
+        self.response = FakeResponse({"retry-after": f"{retry_after:.2f}"})
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.5, requests_per_minute: float | None = None):
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.calls = 0
+        self.rate_limited = 0
+        self._recent = deque()
+
+    def _admit(self):
+        if not self.requests_per_minute:
+            return
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.requests_per_minute:
+            self.rate_limited += 1
+            raise FakeRateLimitError(60 - (now - self._recent[0]))
+        self._recent.append(now)
+
+    def reply(self, prompt: str) -> str:
+        if "Outline:" in prompt:
+            return "1. Introduction\n2. The Challenge\n3. The Solution\n4. Key Takeaways\n5. Conclusion"
+        if "Title:" in prompt:
+            return "A Fake Title"
+        return f"Generated text for a {len(prompt)}-character prompt."
+
+    async def ainvoke(self, prompt: str) -> FakeMessage:
+        self.calls += 1
+        self._admit()
+        await asyncio.sleep(self.latency)
+        return FakeMessage(self.reply(prompt))
+
+    def invoke(self, prompt: str) -> FakeMessage:
+        self.calls += 1
+        self._admit()
+        time.sleep(self.latency)
+        return FakeMessage(self.reply(prompt))
+
+# --- Streaming chat completions, shaped like groq.Groq().chat.completions ---
+
+@dataclass
+class FakeDelta:
+    content: str | None
+
+@dataclass
+class FakeChoice:
+    delta: FakeDelta | None = None
+    message: FakeMessage | None = None
+
+@dataclass
+class FakeChunk:
+    choices: list
+
+@dataclass
+class FakeCompletion:
+    choices: list
+
+class FakeCompletionStream:
+    def __init__(self, ttft: float, tokens: int, token_latency: float):
+        self.ttft = ttft
+        self.tokens = tokens
+        self.token_latency = token_latency
+        self.closed = False
+
+    def __iter__(self):
+        time.sleep(self.ttft)
+        for i in range(self.tokens):
+            if self.closed:
+                return
+            if i:
+                time.sleep(self.token_latency)
+            yield FakeChunk([FakeChoice(FakeDelta(f"token{i} "))])
+
+    def close(self):
+        self.closed = True
+
+class FakeGroqClient:
+    """
+    `chat.completions.create(..., stream=True)` yields `tokens` chunks after `ttft` seconds;
+    without stream=True it returns the whole message once they would all have arrived.
+    """
+
+    def __init__(self, ttft: float = 0.3, tokens: int = 60, token_latency: float = 0.005):
+        self.ttft = ttft
+        self.tokens = tokens
+        self.token_latency = token_latency
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, messages: list, model: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        stream_of_chunks = FakeCompletionStream(self.ttft, self.tokens, self.token_latency)
+        if stream:
+            return stream_of_chunks
+        text = "".join(chunk.choices[0].delta.content for chunk in stream_of_chunks)
+        return FakeCompletion([FakeChoice(message=FakeMessage(text))])
@@ -0,0 +1,115 @@
+# fake_sarvam.py
+#
+# Stand-in for the Sarvam batch job API and its DataLake storage. The API is served
+# through an httpx MockTransport installed as audio_transcribe's shared client, and
+# storage directories map onto a local folder. A started job completes `processing`
+# seconds later by writing `transcript_for(job_id)` to its output directory.
+
+import os
+import json
+import time
+import uuid
+import asyncio
+from collections import deque
+
+import httpx
+
+from python_helpers import audio_transcribe
+from python_helpers.audio_transcribe import SarvamClient
+from benchmarks.bench_storage_transfer import FakeDirectoryClient
+
+STORAGE_ACCOUNT = "https://fakesarvam.blob.core.windows.net"
+
+def install_fake_storage(root: str, latency: float = 0.01):
+    """Points every SarvamClient at `root`/<file system>/<directory> instead of Azure."""
+    def local_dir(client: SarvamClient) -> str:
+        path = os.path.join(root, client.file_system_name, client.directory_name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def directory_client(self):
+        return FakeDirectoryClient(local_dir(self), audio_transcribe.TRANSFER_CHUNK_SIZE, latency)
+
+    async def list_files(self):
+        await asyncio.sleep(latency)
+        return sorted(os.listdir(local_dir(self)))
+
+    SarvamClient._directory_client = directory_client
+    SarvamClient.list_files = list_files
+
+class FakeSarvamAPI:
+    def __init__(self, storage_root: str, transcript_for, latency: float = 0.02,
+                 processing: float = 1.0, requests_per_second: float | None = None):
+        self.storage_root = storage_root
+        self.transcript_for = transcript_for
+        self.latency = latency
+        self.processing = processing
+        self.requests_per_second = requests_per_second
+        self.jobs = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self._recent = deque()
+
+    def _storage_path(self, job_id: str, kind: str) -> str:
+        return f"{STORAGE_ACCOUNT}/jobs/{job_id}/{kind}?sv=fake"
+
+    def _local_dir(self, job_id: str, kind: str) -> str:
+        path = os.path.join(self.storage_root, "jobs", job_id, kind)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _admit(self) -> bool:
+        if not self.requests_per_second:
+            return True
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1:
+            self._recent.popleft()
+        if len(self._recent) >= self.requests_per_second:
+            self.rate_limited += 1
+            return False
+        self._recent.append(now)
+        return True
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if not self._admit():
+            return httpx.Response(429, headers={"Retry-After": "1"})
+
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/job/init"):
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {"started": None}
+            return httpx.Response(202, json={
+                "job_id": job_id,
+                "input_storage_path": self._storage_path(job_id, "input"),
+                "output_storage_path": self._storage_path(job_id, "output"),
+            })
+        if request.method == "POST" and path.endswith("/job"):
+            job_id = json.loads(request.content)["job_id"]
+            self.jobs[job_id]["started"] = time.monotonic()
+            return httpx.Response(200, json={"job_id": job_id, "job_state": "Accepted"})
+        if request.method == "GET" and path.endswith("/status"):
+            job_id = path.split("/")[-2]
+            job = self.jobs.get(job_id)
+            if job is None:
+                return httpx.Response(404, json={"error": "unknown job"})
+            if job["started"] is None or time.monotonic() - job["started"] < self.processing:
+                return httpx.Response(200, json={"job_id": job_id, "job_state": "Running"})
+            inputs = sorted(os.listdir(self._local_dir(job_id, "input")))
+            output = os.path.join(self._local_dir(job_id, "output"), "0.json")
+            if not os.path.exists(output):
+                with open(output, "w") as f:
+                    json.dump(self.transcript_for(job_id), f)
+            return httpx.Response(200, json={
+                "job_id": job_id,
+                "job_state": "Completed",
+                "job_details": [{"file_id": "0", "file_name": inputs[0] if inputs else "audio.mp3"}],
+            })
+        return httpx.Response(404, json={"error": f"no route for {request.method} {path}"})
+
+    def install(self):
+        """Makes audio_transcribe send its Sarvam requests here."""
+        audio_transcribe._http_client = httpx.AsyncClient(
+            base_url="https://fake-sarvam.local", transport=httpx.MockTransport(self.handle)
+        )
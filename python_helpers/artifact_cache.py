@@ -0,0 +1,102 @@
+# artifact_cache.py
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# --- 1. CONFIGURATION ---
+ARTIFACT_CACHE_DIR = os.getenv(
+    "ARTIFACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yt-vid-talker-artifacts")
+)
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(5 * 1024**3)))
+
+# --- 2. ARTIFACT STORE ---
+
+def config_hash(config: dict) -> str:
+    """Stable short hash of a pipeline config dict."""
+    payload = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class ArtifactCache:
+    """
+    Local store of pipeline outputs laid out as <root>/<video_id>/<config_hash>/<name>.
+    A file's mtime doubles as its last-access time, so eviction is least-recently-used.
+    The store's size is kept as a running total; the tree is only walked to count it
+    once, and when something has to be evicted. Copies happen outside the lock, and
+    eviction skips files being read. Every method does blocking file I/O, so async
+    callers run them with asyncio.to_thread.
+    """
+
+    def __init__(self, root: str = ARTIFACT_CACHE_DIR, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # counted on the first put
+        self._reading = {}  # path -> fetches copying it right now
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, video_id: str, config: dict, name: str) -> str:
+        return os.path.join(self.root, video_id, config_hash(config), name)
+
+    def fetch(self, video_id: str, config: dict, name: str, destination: str) -> bool:
+        """Copies a cached artifact to `destination`. Returns False on a miss."""
+        path = self._path(video_id, config, name)
+        with self._lock:
+            if not os.path.exists(path):
+                return False
+            os.utime(path)
+            self._reading[path] = self._reading.get(path, 0) + 1
+        try:
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            return False
+        finally:
+            with self._lock:
+                self._reading[path] -= 1
+                if not self._reading[path]:
+                    del self._reading[path]
+        return True
+
+    def put(self, video_id: str, config: dict, name: str, source: str) -> str:
+        """Copies `source` into the store atomically, then evicts down to the size limit."""
+        path = self._path(video_id, config, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(source, tmp_path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._files())
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            self._total_bytes += os.path.getsize(tmp_path) - replaced
+            os.replace(tmp_path, path)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every stored artifact."""
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                stat = os.stat(full_path)
+                files.append((stat.st_mtime, stat.st_size, full_path))
+        return files
+
+    def _evict(self):
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for _, size, full_path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if full_path in self._reading:
+                continue  # being copied out; a later put can evict it
+            os.remove(full_path)
+            total -= size
+            print(f"Evicted cached artifact: {full_path}")
+        self._total_bytes = total
@@ -0,0 +1,188 @@
+# audio_segments.py
+
+import os
+import re
+import bisect
+import tempfile
+import subprocess
+
+from python_helpers.yt_downloader import AUDIO_CODEC_ARGS
+
+# --- 1. CONFIGURATION ---
+SEGMENT_CONFIG = {
+    # Audio longer than 1.5x the target is split into roughly target-length segments
+    "target_seconds": float(os.getenv("SEGMENT_TARGET_SECONDS", "600")),
+    # A cut may move this far (as a fraction of the target) to land in a silence
+    "search_window": 0.25,
+    "silence_db": float(os.getenv("SILENCE_THRESHOLD_DB", "-35")),
+    "min_silence_seconds": float(os.getenv("MIN_SILENCE_SECONDS", "0.5")),
+}
+
+SILENCE_START_PATTERN = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END_PATTERN = re.compile(r"silence_end: (-?[\d.]+)")
+
+# --- 2. SILENCE DETECTION ---
+
+def detect_silences(path: str, silence_db: float = SEGMENT_CONFIG["silence_db"],
+                    min_silence: float = SEGMENT_CONFIG["min_silence_seconds"]) -> list[tuple[float, float]]:
+    """Returns (start, end) pairs of silent stretches, using ffmpeg's silencedetect filter."""
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-hide_banner", "-i", path,
+         "-af", f"silencedetect=noise={silence_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True, text=True, check=True,
+    )
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        if match := SILENCE_START_PATTERN.search(line):
+            start = max(float(match.group(1)), 0.0)
+        elif (match := SILENCE_END_PATTERN.search(line)) and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+# --- 3. SEGMENTATION ---
+
+def plan_cuts(duration: float, silences: list[tuple[float, float]],
+              target_seconds: float = SEGMENT_CONFIG["target_seconds"],
+              search_window: float = SEGMENT_CONFIG["search_window"]) -> list[float]:
+    """
+    Picks cut points roughly every `target_seconds`, each moved to the middle of the
+    nearest silence within the search window so no words are split. Falls back to a
+    hard cut at the target when there is no silence nearby.
+    """
+    if duration <= target_seconds * 1.5:
+        return []
+
+    window = target_seconds * search_window
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = []
+    target = target_seconds
+    while duration - target > target_seconds / 2:
+        nearby = [m for m in midpoints if abs(m - target) <= window and m > (cuts[-1] if cuts else 0)]
+        cut = min(nearby, key=lambda m: abs(m - target)) if nearby else target
+        cuts.append(cut)
+        target = cut + target_seconds
+    return cuts
+
+def split_audio(path: str, cuts: list[float], output_dir: str) -> list[tuple[float, str]]:
+    """Splits `path` at the cut points without re-encoding. Returns (offset_seconds, file) pairs."""
+    os.makedirs(output_dir, exist_ok=True)
+    extension = os.path.splitext(path)[1]
+    bounds = [0.0, *cuts, None]
+    segments = []
+    for i, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        segment_path = os.path.join(output_dir, f"segment_{i:03d}{extension}")
+        command = ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-ss", f"{start:.3f}", "-i", path]
+        if end is not None:
+            command += ["-t", f"{end - start:.3f}"]
+        subprocess.run([*command, "-c", "copy", segment_path], check=True)
+        segments.append((start, segment_path))
+    return segments
+
+# --- 4. SILENCE TRIMMING ---
+
+TRIM_CONFIG = {
+    "enabled": os.getenv("TRIM_SILENCE", "false").lower() in ("1", "true", "yes"),
+    # Only gaps at least this long are removed, keeping `padding_seconds` of each edge
+    "min_silence_seconds": float(os.getenv("TRIM_MIN_SILENCE_SECONDS", "1.5")),
+    "padding_seconds": float(os.getenv("TRIM_PADDING_SECONDS", "0.2")),
+    "silence_db": float(os.getenv("SILENCE_THRESHOLD_DB", "-35")),
+}
+
+def probe_bit_rate(path: str) -> int | None:
+    """Returns the first audio stream's bit rate in bits/s, or None if ffprobe cannot tell."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=bit_rate", "-of", "csv=p=0", path],
+            capture_output=True, text=True, check=True,
+        )
+        return int(result.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+def encoder_args(path: str) -> list[str]:
+    """ffmpeg arguments that re-encode like the source: same codec, and same bit rate if lossy."""
+    args = list(AUDIO_CODEC_ARGS.get(os.path.splitext(path)[1].lstrip("."), []))
+    if "-b:a" in args and (bit_rate := probe_bit_rate(path)):
+        args[args.index("-b:a") + 1] = str(bit_rate)
+    return args
+
+def speech_intervals(duration: float, silences: list[tuple[float, float]],
+                     padding: float = TRIM_CONFIG["padding_seconds"]) -> list[tuple[float, float]]:
+    """Returns the (start, end) stretches to keep: everything but the padded-in silences."""
+    keep = []
+    cursor = 0.0
+    for start, end in silences:
+        # Leading and trailing silence goes entirely; gaps inside keep a little padding
+        start = start + padding if start > 0 else 0.0
+        end = end - padding if end < duration else duration
+        if end <= start:
+            continue
+        if start > cursor:
+            keep.append((cursor, start))
+        cursor = max(cursor, end)
+    if duration > cursor:
+        keep.append((cursor, duration))
+    return keep
+
+def build_offset_map(intervals: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    """Returns (trimmed_start, original_start) for each kept interval, in order."""
+    offset_map = []
+    trimmed = 0.0
+    for start, end in intervals:
+        offset_map.append((trimmed, start))
+        trimmed += end - start
+    return offset_map
+
+def to_original_time(seconds: float, offset_map: list[tuple[float, float]]) -> float:
+    """Maps a timestamp in the trimmed audio back to the original audio."""
+    position = bisect.bisect_right([trimmed for trimmed, _ in offset_map], seconds) - 1
+    trimmed_start, original_start = offset_map[max(position, 0)]
+    return original_start + (seconds - trimmed_start)
+
+def remap_transcript(transcript: dict, offset_map: list[tuple[float, float]]) -> dict:
+    """Shifts every diarized entry's timestamps from the trimmed timeline to the original one."""
+    for entry in (transcript.get("diarized_transcript") or {}).get("entries", []):
+        for key in ("start_time_seconds", "end_time_seconds"):
+            if key in entry:
+                entry[key] = round(to_original_time(entry[key], offset_map), 3)
+    return transcript
+
+def trim_silence(path: str, output_path: str, duration: float) -> dict | None:
+    """
+    Writes `path` minus its long silences to `output_path` (sample-accurate, via ffmpeg's
+    aselect filter), encoded like the source. Returns the offset map and savings, or None
+    if nothing was trimmed or the trimmed file would not be smaller to upload.
+    """
+    silences = detect_silences(path, TRIM_CONFIG["silence_db"], TRIM_CONFIG["min_silence_seconds"])
+    intervals = speech_intervals(duration, silences)
+    kept_seconds = sum(end - start for start, end in intervals)
+    if not intervals or kept_seconds >= duration - 0.5:
+        return None
+
+    selection = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in intervals)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as script:
+        script.write(f"aselect='{selection}',asetpts=N/SR/TB")
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-i", path,
+             "-filter_script:a", script.name, *encoder_args(path), output_path],
+            check=True,
+        )
+    finally:
+        os.remove(script.name)
+
+    bytes_saved = os.path.getsize(path) - os.path.getsize(output_path)
+    if bytes_saved <= 0:
+        print(f"Trimmed audio is not smaller ({-bytes_saved} bytes more); uploading the original")
+        os.remove(output_path)
+        return None
+    return {
+        "path": output_path,
+        "offset_map": build_offset_map(intervals),
+        "original_seconds": round(duration, 3),
+        "seconds_saved": round(duration - kept_seconds, 3),
+        "bytes_saved": bytes_saved,
+    }
@@ -1,16 +1,22 @@
 import asyncio
 import aiofiles
-import requests
+import httpx
 import json
+import random
 from urllib.parse import urlparse
 from azure.storage.filedatalake.aio import DataLakeDirectoryClient, FileSystemClient
 from azure.storage.filedatalake import ContentSettings
+from azure.core import MatchConditions
 import mimetypes
 import logging
 from pprint import pprint
 import os
 import dotenv
 
+from python_helpers.audio_segments import SEGMENT_CONFIG, detect_silences, plan_cuts, split_audio
+from python_helpers.transcript_stitch import stitch_transcripts
+from python_helpers.metrics import span, increment
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
@@ -19,6 +25,110 @@ logger = logging.getLogger(__name__)
 dotenv.load_dotenv()
 
 API_SUBSCRIPTION_KEY = os.getenv("SARVAM_API_KEY")
+JOB_PARAMETERS = {"with_diarization": True}
+
+# --- HTTP client configuration ---
+# Point SARVAM_API_BASE at a local fake server to run the pipeline offline
+SARVAM_API_BASE = os.getenv("SARVAM_API_BASE", "https://api.sarvam.ai")
+SARVAM_TIMEOUT = float(os.getenv("SARVAM_TIMEOUT", "30"))
+SARVAM_MAX_RETRIES = int(os.getenv("SARVAM_MAX_RETRIES", "4"))
+SARVAM_BACKOFF_BASE = float(os.getenv("SARVAM_BACKOFF_BASE", "0.5"))
+SARVAM_BACKOFF_CAP = float(os.getenv("SARVAM_BACKOFF_CAP", "20"))
+# How many Sarvam jobs a segmented transcription may run at once
+SARVAM_PARALLEL_JOBS = int(os.getenv("SARVAM_PARALLEL_JOBS", "4"))
+# Rough processing time per second of audio, used to space out status polls
+SARVAM_PROCESSING_RATIO = float(os.getenv("SARVAM_PROCESSING_RATIO", "0.1"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# A POST that fails after reaching Sarvam may still have created or started a job, so it is
+# only resent when the server refused it (429) or it never left (connection errors)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# --- Storage transfer configuration ---
+# Files move in chunks of this size, with at most this many chunks in flight per file,
+# so peak memory per transfer is bounded by chunk size x concurrency
+TRANSFER_CHUNK_SIZE = int(os.getenv("SARVAM_TRANSFER_CHUNK_SIZE", str(4 * 1024 * 1024)))
+TRANSFER_CONCURRENCY = int(os.getenv("SARVAM_TRANSFER_CONCURRENCY", "4"))
+
+_http_client: httpx.AsyncClient | None = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared keep-alive client for the Sarvam job API."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=SARVAM_API_BASE,
+            headers={"API-Subscription-Key": API_SUBSCRIPTION_KEY or ""},
+            timeout=httpx.Timeout(SARVAM_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header."""
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return random.uniform(0, min(SARVAM_BACKOFF_CAP, SARVAM_BACKOFF_BASE * 2 ** attempt))
+
+async def sarvam_request(method: str, path: str, **kwargs) -> httpx.Response:
+    """
+    Sends a request to the Sarvam API, retrying transport errors and 429/5xx responses.
+    Non-idempotent methods (the POSTs that create and start jobs) are only retried on 429
+    and on errors raised before the request was sent, so a job is never created twice.
+    """
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    retry_codes = RETRY_STATUS_CODES if idempotent else {429}
+    for attempt in range(SARVAM_MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            response = await get_http_client().request(method, path, **kwargs)
+            if response.status_code not in retry_codes or attempt == SARVAM_MAX_RETRIES:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            print(f"⚠️ {method} {path} returned {response.status_code}; retrying...")
+        except httpx.TransportError as e:
+            if attempt == SARVAM_MAX_RETRIES or not (idempotent or isinstance(e, UNSENT_ERRORS)):
+                raise
+            print(f"⚠️ {method} {path} failed ({e!r}); retrying...")
+        increment("sarvam.retries")
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+async def get_audio_duration(path: str) -> float:
+    """Returns the audio duration in seconds via ffprobe, or 0.0 if it cannot be read."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            return 0.0
+        return float(stdout.decode().strip())
+    except (OSError, ValueError):
+        return 0.0
+
+def poll_intervals(audio_seconds: float):
+    """
+    Yields the waits between job status checks. The first wait runs to roughly when a
+    job of this length should be half done, then checks back off geometrically, so
+    short clips are picked up within a second or two and long jobs are not hammered.
+    """
+    expected = 5.0 + audio_seconds * SARVAM_PROCESSING_RATIO
+    cap = min(max(expected / 4, 5.0), 60.0)
+    yield min(max(expected / 2, 1.0), 120.0)
+    interval = min(max(expected / 20, 1.0), cap)
+    while True:
+        yield interval * random.uniform(0.9, 1.1)
+        interval = min(interval * 1.5, cap)
 
 class SarvamClient:
     def __init__(self, url: str):
@@ -45,41 +155,77 @@ class SarvamClient:
         sas_token = parsed_url.query
         return account_url, file_system_name, directory_name, sas_token
 
-    async def upload_files(self, local_file_paths, overwrite=True):
-        print(f"Starting upload of {len(local_file_paths)} files")
-        async with DataLakeDirectoryClient(
+    def _directory_client(self):
+        return DataLakeDirectoryClient(
             account_url=f"{self.account_url}?{self.sas_token}",
             file_system_name=self.file_system_name,
             directory_name=self.directory_name,
             credential=None,
-        ) as directory_client:
+            max_single_get_size=TRANSFER_CHUNK_SIZE,
+            max_chunk_get_size=TRANSFER_CHUNK_SIZE,
+        )
+
+    async def upload_files(self, local_file_paths, overwrite=True):
+        print(f"Starting upload of {len(local_file_paths)} files")
+        async with self._directory_client() as directory_client:
             tasks = []
             for path in local_file_paths:
                 file_name = path.split("/")[-1]
                 tasks.append(
                     self._upload_file(directory_client, path, file_name, overwrite)
                 )
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            with span("storage.upload"):
+                results = await asyncio.gather(*tasks, return_exceptions=True)
             print(
-                f"Upload completed for {sum(1 for r in results if not isinstance(r, Exception))} files"
+                f"Upload completed for {sum(1 for r in results if r is True)} files"
             )
 
     async def _upload_file(
         self, directory_client, local_file_path, file_name, overwrite=True
     ):
+        """Streams the file from disk as parallel appends, then commits it with a single flush."""
         try:
-            async with aiofiles.open(local_file_path, mode="rb") as file_data:
-                mime_type = mimetypes.guess_type(local_file_path)[0] or "audio/wav"
-                file_client = directory_client.get_file_client(file_name)
-                data = await file_data.read()
-                await file_client.upload_data(
-                    data,
-                    overwrite=overwrite,
-                    content_settings=ContentSettings(content_type=mime_type),
-                )
-                print(f"✅ File uploaded successfully: {file_name}")
-                print(f"   Type: {mime_type}")
-                return True
+            mime_type = mimetypes.guess_type(local_file_path)[0] or "audio/wav"
+            content_settings = ContentSettings(content_type=mime_type)
+            file_client = directory_client.get_file_client(file_name)
+            conditions = {} if overwrite else {"etag": "*", "match_condition": MatchConditions.IfMissing}
+            await file_client.create_file(content_settings=content_settings, **conditions)
+
+            slots = asyncio.Semaphore(TRANSFER_CONCURRENCY)
+            pending = []
+
+            async def append_chunk(chunk, offset):
+                try:
+                    await file_client.append_data(chunk, offset=offset, length=len(chunk))
+                finally:
+                    slots.release()
+
+            offset = 0
+            try:
+                async with aiofiles.open(local_file_path, mode="rb") as file_data:
+                    while True:
+                        # Wait for a free slot before reading, so unsent chunks never pile up
+                        await slots.acquire()
+                        chunk = await file_data.read(TRANSFER_CHUNK_SIZE)
+                        if not chunk:
+                            slots.release()
+                            break
+                        pending.append(asyncio.create_task(append_chunk(chunk, offset)))
+                        offset += len(chunk)
+                        for task in pending:
+                            if task.done() and task.exception():
+                                raise task.exception()
+                        pending = [task for task in pending if not task.done()]
+                await asyncio.gather(*pending)
+            except BaseException:
+                for task in pending:
+                    task.cancel()
+                raise
+
+            await file_client.flush_data(offset, content_settings=content_settings)
+            print(f"✅ File uploaded successfully: {file_name}")
+            print(f"   Type: {mime_type}, Size: {offset} bytes")
+            return True
         except Exception as e:
             print(f"❌ Upload failed for {file_name}: {str(e)}")
             return False
@@ -102,21 +248,17 @@ class SarvamClient:
         return file_names
 
     async def download_file(self, file_name, destination_dir, new_filename=None):
-
+        """Writes the file to disk chunk by chunk as it downloads."""
         try:
-            async with DataLakeDirectoryClient(
-                account_url=f"{self.account_url}?{self.sas_token}",
-                file_system_name=self.file_system_name,
-                directory_name=self.directory_name,
-                credential=None,
-            ) as directory_client:
-                file_client = directory_client.get_file_client(file_name)
-                download_path = os.path.join(destination_dir, new_filename or file_name)
-
-                async with aiofiles.open(download_path, mode="wb") as file_data:
-                    stream = await file_client.download_file()
-                    data = await stream.readall()
-                    await file_data.write(data)
+            with span("storage.download"):
+                async with self._directory_client() as directory_client:
+                    file_client = directory_client.get_file_client(file_name)
+                    download_path = os.path.join(destination_dir, new_filename or file_name)
+
+                    async with aiofiles.open(download_path, mode="wb") as file_data:
+                        stream = await file_client.download_file()
+                        async for chunk in stream.chunks():
+                            await file_data.write(chunk)
                 print(f"✅ Downloaded: {file_name} -> {download_path}")
                 return True
         except Exception as e:
@@ -125,9 +267,8 @@ class SarvamClient:
         
 async def initialize_job():
     print("\\n🚀 Initializing job...")
-    url = "https://api.sarvam.ai/speech-to-text-translate/job/init"
-    headers = {"API-Subscription-Key": API_SUBSCRIPTION_KEY}
-    response = requests.post(url, headers=headers)
+    with span("sarvam.init"):
+        response = await sarvam_request("POST", "/speech-to-text-translate/job/init")
     print("\\nInitialize Job Response:")
     print(f"Status Code: {response.status_code}")
     print("Response Body:")
@@ -140,9 +281,8 @@ async def initialize_job():
 
 async def check_job_status(job_id):
     print(f"\\n🔍 Checking status for job: {job_id}")
-    url = f"https://api.sarvam.ai/speech-to-text-translate/job/{job_id}/status"
-    headers = {"API-Subscription-Key": API_SUBSCRIPTION_KEY}
-    response = requests.get(url, headers=headers)
+    with span("sarvam.status"):
+        response = await sarvam_request("GET", f"/speech-to-text-translate/job/{job_id}/status")
     print("\\nJob Status Response:")
     print(f"Status Code: {response.status_code}")
     print("Response Body:")
@@ -155,16 +295,12 @@ async def check_job_status(job_id):
 
 async def start_job(job_id):
     print(f"\\n▶️ Starting job: {job_id}")
-    url = "https://api.sarvam.ai/speech-to-text-translate/job"
-    headers = {
-        "API-Subscription-Key": API_SUBSCRIPTION_KEY,
-        "Content-Type": "application/json",
-    }
-    data = {"job_id": job_id, "job_parameters": {"with_diarization": True}}
+    data = {"job_id": job_id, "job_parameters": JOB_PARAMETERS}
     print("\\nRequest Body:")
     pprint(data)
 
-    response = requests.post(url, headers=headers, data=json.dumps(data))
+    with span("sarvam.start"):
+        response = await sarvam_request("POST", "/speech-to-text-translate/job", json=data)
     print("\\nStart Job Response:")
     print(f"Status Code: {response.status_code}")
     print("Response Body:")
@@ -178,7 +314,7 @@ import os
 import asyncio
 # (other imports, e.g., SarvamClient, start_job, check_job_status, etc.)
 
-async def audio_main():
+async def audio_main(local_files=None, destination_dir="./transcribed_output"):
     print("\n=== Starting Speech-to-Text Processing ===")
 
     # Step 1: Initialize the job
@@ -194,7 +330,7 @@ async def audio_main():
     # Step 2: Upload files
     print(f"\n📤 Uploading files to input storage: {input_storage_path}")
     client = SarvamClient(input_storage_path)
-    local_files = ["audio_16Khz.mp3"]  # Replace with your audio files
+    local_files = local_files or ["audio_16Khz.mp3"]
     print(f"Files to upload: {local_files}")
     await client.upload_files(local_files)
 
@@ -206,26 +342,29 @@ async def audio_main():
 
     # Step 4: Monitor job status
     print("\n⏳ Monitoring job status...")
-    attempt = 1
-    status = None
-    while True:
-        print(f"\nStatus check attempt {attempt}")
-        job_status = await check_job_status(job_id)
-        if not job_status:
-            print("❌ Failed to get job status")
-            break
-
-        status = job_status.get("job_state")
-        if status == "Completed":
-            print("✅ Job completed successfully!")
-            break
-        elif status == "Failed":
-            print("❌ Job failed!")
-            break
-        else:
-            print(f"⏳ Current status: {status}")
-            await asyncio.sleep(10)
-        attempt += 1
+    audio_seconds = sum([await get_audio_duration(path) for path in local_files])
+    waits = poll_intervals(audio_seconds)
+    with span("sarvam.wait"):
+        attempt = 1
+        status = None
+        while True:
+            print(f"\nStatus check attempt {attempt}")
+            job_status = await check_job_status(job_id)
+            if not job_status:
+                print("❌ Failed to get job status")
+                break
+
+            status = job_status.get("job_state")
+            if status == "Completed":
+                print("✅ Job completed successfully!")
+                break
+            elif status == "Failed":
+                print("❌ Job failed!")
+                break
+            else:
+                print(f"⏳ Current status: {status}")
+                await asyncio.sleep(next(waits))
+            attempt += 1
 
     # Step 5: Download results
     if status == "Completed":
@@ -240,7 +379,6 @@ async def audio_main():
             return None
 
         print(f"Files to download: {files}")
-        destination_dir = "./transcribed_output"
         os.makedirs(destination_dir, exist_ok=True)
 
         try:
@@ -298,6 +436,56 @@ async def audio_main():
     return None
 
 
+async def transcribe_audio(audio_file, destination_dir="./transcribed_output"):
+    """
+    Transcribes one audio file and returns the transcript path. Long audio is split at
+    silences into segments that run as parallel Sarvam jobs, and their transcripts are
+    stitched back into a single file with timestamps on the original timeline.
+    """
+    duration = await get_audio_duration(audio_file)
+    cuts = []
+    if duration > SEGMENT_CONFIG["target_seconds"] * 1.5:
+        with span("ffmpeg.silencedetect"):
+            silences = await asyncio.to_thread(detect_silences, audio_file)
+        cuts = plan_cuts(duration, silences)
+    if not cuts:
+        return await audio_main([audio_file], destination_dir)
+
+    segment_dir = os.path.join(destination_dir, "segments")
+    with span("ffmpeg.split"):
+        segments = await asyncio.to_thread(split_audio, audio_file, cuts, segment_dir)
+    print(f"\n✂️ Split {duration:.0f}s of audio into {len(segments)} segments at {[round(c, 1) for c in cuts]}")
+
+    slots = asyncio.Semaphore(SARVAM_PARALLEL_JOBS)
+
+    async def transcribe_segment(number, segment_path):
+        # Each job downloads into its own directory: Sarvam names every output 0.json
+        async with slots:
+            return await audio_main([segment_path], os.path.join(destination_dir, "segments", str(number)))
+
+    try:
+        transcript_paths = await asyncio.gather(*(
+            transcribe_segment(number, path) for number, (_, path) in enumerate(segments)
+        ))
+    finally:
+        for _, path in segments:
+            os.remove(path)
+    if not all(transcript_paths):
+        print("❌ One or more segment transcriptions failed")
+        return None
+
+    parts = []
+    for (offset, _), transcript_path in zip(segments, transcript_paths):
+        with open(transcript_path, "r") as f:
+            parts.append((offset, json.load(f)))
+
+    merged_path = os.path.join(destination_dir, "transcript.json")
+    with open(merged_path, "w") as f:
+        json.dump(stitch_transcripts(parts), f)
+    print(f"🧵 Stitched {len(parts)} segment transcripts into {merged_path}")
+    return merged_path
+
+
 # Run the main function
 if __name__ == "__main__":
     asyncio.run(audio_main())
\ No newline at end of file
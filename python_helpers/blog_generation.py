@@ -1,19 +1,31 @@
-import time
 import re
 import json
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Awaitable, Callable
 from dotenv import load_dotenv
 
-# LangChain Imports
-from langchain_groq import ChatGroq
-from langchain_classic.chains.summarize.chain import load_summarize_chain
-from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
-from langchain_classic.docstore.document import Document
+from python_helpers.rate_limit import RateLimiter, groq_limiter, ainvoke_limited, estimate_tokens
+from python_helpers.summary_cache import get_summary_cache, summary_key
 
 load_dotenv()
 
 # --- LangChain Model Initialization ---
-# Initialize the model once for the entire module for efficiency
-llm = ChatGroq(model_name="llama-3.1-8b-instant", temperature=0.2)
+# The model is created once, on first use; LangChain is only imported then too,
+# which keeps it off the API's cold-start path
+BLOG_LLM_MODEL = "llama-3.1-8b-instant"
+BLOG_LLM_TEMPERATURE = 0.2
+
+@lru_cache(maxsize=1)
+def get_llm():
+    from langchain_groq import ChatGroq
+    # Retries on 429 are left to ainvoke_limited, which also slows every other caller down
+    return ChatGroq(model_name=BLOG_LLM_MODEL, temperature=BLOG_LLM_TEMPERATURE, max_retries=0)
+
+def llm_identity(llm) -> str:
+    """What distinguishes one model's cached summaries from another's."""
+    return f"{getattr(llm, 'model_name', type(llm).__name__)}@{getattr(llm, 'temperature', '')}"
 
 
 def clean_section(text: str) -> str:
@@ -32,26 +44,63 @@ def read_transcript(file_path: str) -> str | None:
         print(f"❌ Error: Could not read or find the file at {file_path}")
         return None
 
-def generate_blog_post(transcript_file_path: str) -> str:
-    """Generate a concise blog post from a transcript file using LangChain."""
-    transcript_text = read_transcript(transcript_file_path)
-    if not transcript_text:
-        return "Error: Could not read or find the transcript text."
-
-    # 1. Split the text and create LangChain Document objects
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
-    docs = [Document(page_content=chunk) for chunk in text_splitter.split_text(transcript_text)]
-    
-    # 2. Use LangChain's Map-Reduce chain to get a condensed summary
-    # This replaces the manual for-loop and time.sleep(), solving the rate limit error.
-    print(f"Summarizing content using LangChain ({len(docs)} documents)...")
-    chain = load_summarize_chain(llm, chain_type="map_reduce")
-    condensed_context = chain.invoke(docs, return_only_outputs=True)['output_text']
-    print("Content summarized. Generating final blog post components...")
-
-    # 3. Generate the final blog components from the high-quality summary
-    # We use the same LLM instance for these final, less frequent calls.
-    prompt_templates = {
+# --- Map-reduce summary ---
+# The prompt and collapse threshold of LangChain's map_reduce summarize chain; the map step
+# runs here instead, so every call goes through the shared rate limiter concurrently
+SUMMARY_TOKEN_MAX = 3000
+BLOG_CHUNK_SIZE = 2000
+BLOG_CHUNK_OVERLAP = 200
+
+def summary_prompt(text: str) -> str:
+    from langchain_classic.chains.summarize.map_reduce_prompt import PROMPT
+    return PROMPT.format(text=text)
+
+async def reduce_summaries(summaries: list[str], summarize: Callable[[str], Awaitable[str]]) -> str:
+    """Combines chunk summaries into one, collapsing them in groups while they are too long."""
+    while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > SUMMARY_TOKEN_MAX:
+        groups, group = [], []
+        for summary in summaries:
+            if group and estimate_tokens("\n\n".join(group + [summary])) > SUMMARY_TOKEN_MAX:
+                groups.append(group)
+                group = []
+            group.append(summary)
+        groups.append(group)
+        if len(groups) == len(summaries):
+            break
+        summaries = await asyncio.gather(*(summarize(summary_prompt("\n\n".join(group))) for group in groups))
+    return await summarize(summary_prompt("\n\n".join(summaries)))
+
+def split_transcript(transcript_text: str) -> list[str]:
+    from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=BLOG_CHUNK_SIZE, chunk_overlap=BLOG_CHUNK_OVERLAP)
+    return text_splitter.split_text(transcript_text)
+
+def cached_summarizer(llm, limiter: RateLimiter, stats: dict) -> Callable[[str], Awaitable[str]]:
+    """
+    Returns an async prompt -> summary function that serves repeated prompts from the
+    summary cache, so a regeneration only pays for chunks whose text changed.
+    Counts hits and LLM calls in `stats`.
+    """
+    cache = get_summary_cache()
+    model = llm_identity(llm)
+
+    async def summarize(prompt: str) -> str:
+        key = summary_key(model, prompt)
+        if cache is not None and (text := cache.get(key)) is not None:
+            stats["cached"] = stats.get("cached", 0) + 1
+            return text
+        text = await ainvoke_limited(llm, prompt, limiter)
+        stats["generated"] = stats.get("generated", 0) + 1
+        if cache is not None:
+            cache.put(key, text)
+        return text
+    return summarize
+
+# --- Blog components ---
+
+def blog_prompts(condensed_context: str) -> dict:
+    return {
         "title": (
             "You are a professional blog writer. Generate ONLY a title, no explanations or options. "
             "Create a clear, engaging blog title that captures the main value. "
@@ -68,43 +117,29 @@ def generate_blog_post(transcript_file_path: str) -> str:
             "5. Conclusion (what's next)\n\n"
             f"Keep headings clear and direct.\n\n{condensed_context}\n\nOutline:"
         ),
-        "section": (
-            "You are a professional blog writer. Generate ONLY the section content, no explanations or options. "
-            "Keep it clear and practical. "
-            "Use simple examples where helpful. "
-            "Aim for 2-3 paragraphs.\n\n"
-            f"Context:\n{condensed_context}\n\nSection:"
-        ),
         "summary": (
             "You are a professional blog writer. Generate ONLY the summary, no explanations or options. "
             "Write a brief 100-word summary that captures the main points. "
             "Keep it simple and actionable.\n\n"
             f"Content:\n\n{condensed_context}\n\nSummary:"
         ),
-        "chunk_summary": (
-            "You are a professional blog writer. Generate ONLY the summary, no explanations or options. "
-            "Extract the key points and main ideas. "
-            f"Focus on practical insights.\n\n{condensed_context}\n\nSummary:"
-        )
     }
-    
-    title = llm.invoke(prompt_templates["title"]).content.strip()
-    outline_raw = llm.invoke(prompt_templates["outline"]).content.strip()
-    headings = [line.strip("-•12345. \n") for line in outline_raw.split("\n") if line.strip()]
-
-    sections = []
-    for heading in headings:
-        prompt = prompt_templates["section"].format(heading=heading)
-        section_content = llm.invoke(prompt).content
-        cleaned_section = clean_section(section_content)
-        sections.append(f"### {heading}\n{cleaned_section}")
-        time.sleep(2)
 
-    full_content = "\n\n".join(sections)
-    summary_prompt = prompt_templates["summary"].format(full_content=full_content)
-    summary = llm.invoke(summary_prompt).content.strip()
+def section_prompt(heading: str, condensed_context: str) -> str:
+    return (
+        "You are a professional blog writer. Generate ONLY the section content, no explanations or options. "
+        "Keep it clear and practical. "
+        "Use simple examples where helpful. "
+        "Aim for 2-3 paragraphs.\n\n"
+        f"Section heading: {heading}\n\n"
+        f"Context:\n{condensed_context}\n\nSection:"
+    )
+
+def parse_headings(outline_raw: str) -> list[str]:
+    return [line.strip("-•12345. \n") for line in outline_raw.split("\n") if line.strip()]
 
-    # 4. Assemble the final blog post
+def assemble_blog_post(title: str, sections: list[str], summary: str) -> str:
+    full_content = "\n\n".join(sections)
     cta_section = (
         "\n\n---\n\n"
         "## Ready to Learn More?\n\n"
@@ -112,14 +147,100 @@ def generate_blog_post(transcript_file_path: str) -> str:
         "2. Leave a comment with your thoughts\n"
         "3. Subscribe for more insights"
     )
-    
-    blog_post = f"# {title}\n\n{full_content}\n\n**Summary:**\n{summary}\n{cta_section}"
-    
-    return blog_post
-
-
-
-
+    return f"# {title}\n\n{full_content}\n\n**Summary:**\n{summary}\n{cta_section}"
+
+async def blog_post_events(transcript_file_path: str, llm=None, limiter: RateLimiter = groq_limiter):
+    """
+    Generates a blog post from a transcript file, yielding (event, data) pairs as it goes:
+    "progress" for each finished map step and the reduce, then "title", "outline", each
+    "section" as soon as it is written (with its outline index), "summary", and finally
+    "done" with the assembled post. Yields "error" and stops if the transcript is unreadable.
+
+    Every LLM call is async and goes through `limiter`; independent calls run concurrently.
+    `llm` is anything with an async `ainvoke(prompt)`. Closing the generator early cancels
+    the calls still in flight.
+    """
+    llm = llm or get_llm()
+    transcript_text = read_transcript(transcript_file_path)
+    if not transcript_text:
+        yield "error", {"message": "Could not read or find the transcript text."}
+        return
 
+    pending = []
+    def start(prompt: str) -> asyncio.Task:
+        task = asyncio.ensure_future(ainvoke_limited(llm, prompt, limiter))
+        pending.append(task)
+        return task
 
+    try:
+        # 1. Map-reduce the transcript into a condensed summary, reusing whatever was
+        #    summarized before for the same text, chunking and model
+        summary_cache = get_summary_cache()
+        condensed_key = summary_key(
+            llm_identity(llm), "condensed", hashlib.sha256(transcript_text.encode("utf-8")).hexdigest(),
+            BLOG_CHUNK_SIZE, BLOG_CHUNK_OVERLAP, SUMMARY_TOKEN_MAX,
+        )
+        condensed_context = summary_cache.get(condensed_key) if summary_cache is not None else None
+        if condensed_context is not None:
+            print("Reusing the cached transcript summary.")
+            yield "progress", {"stage": "reduce", "cached": True}
+        else:
+            stats = {}
+            summarize = cached_summarizer(llm, limiter, stats)
+            chunks = split_transcript(transcript_text)
+            print(f"Summarizing content ({len(chunks)} chunks)...")
+            map_tasks = [asyncio.ensure_future(summarize(summary_prompt(chunk))) for chunk in chunks]
+            pending.extend(map_tasks)
+            for completed, task in enumerate(asyncio.as_completed(map_tasks), start=1):
+                await task
+                yield "progress", {"stage": "map", "completed": completed, "total": len(chunks),
+                                   "cached": stats.get("cached", 0)}
+            yield "progress", {"stage": "reduce"}
+            condensed_context = await reduce_summaries([task.result() for task in map_tasks], summarize)
+            if summary_cache is not None:
+                summary_cache.put(condensed_key, condensed_context)
+            print(f"Content summarized ({stats.get('cached', 0)} cached, {stats.get('generated', 0)} generated).")
+        print("Generating final blog post components...")
+
+        # 2. Title, outline and summary only need the condensed context
+        prompts = blog_prompts(condensed_context)
+        title_task, outline_task, summary_task = (start(prompts[name]) for name in ("title", "outline", "summary"))
+        title = (await title_task).strip()
+        yield "title", title
+        headings = parse_headings((await outline_task).strip())
+        yield "outline", headings
+
+        # 3. All sections at once, streamed as they finish and assembled in outline order
+        async def write_section(index: int, heading: str) -> tuple[int, str]:
+            content = await ainvoke_limited(llm, section_prompt(heading, condensed_context), limiter)
+            return index, f"### {heading}\n{clean_section(content)}"
+
+        sections = [None] * len(headings)
+        section_tasks = [asyncio.ensure_future(write_section(i, heading)) for i, heading in enumerate(headings)]
+        pending.extend(section_tasks)
+        for task in asyncio.as_completed(section_tasks):
+            index, markdown = await task
+            sections[index] = markdown
+            yield "section", {"index": index, "heading": headings[index], "markdown": markdown}
+
+        summary = (await summary_task).strip()
+        yield "summary", summary
+
+        # 4. Assemble the final blog post
+        yield "done", {"blog_content": assemble_blog_post(title, sections, summary)}
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def generate_blog_post_async(transcript_file_path: str, llm=None,
+                                   limiter: RateLimiter = groq_limiter) -> str:
+    """Generates the whole blog post; see blog_post_events for how the calls are scheduled."""
+    async for event, data in blog_post_events(transcript_file_path, llm, limiter):
+        if event == "error":
+            return f"Error: {data['message']}"
+        if event == "done":
+            return data["blog_content"]
 
+def generate_blog_post(transcript_file_path: str) -> str:
+    """Synchronous wrapper around generate_blog_post_async, for scripts."""
+    return asyncio.run(generate_blog_post_async(transcript_file_path))
@@ -0,0 +1,75 @@
+# chunking.py
+
+import os
+
+# --- 1. CONFIGURATION ---
+CHUNK_CONFIG = {
+    # A chunk closes before it would exceed either bound; 0 disables chunking (one vector per entry)
+    "max_tokens": int(os.getenv("CHUNK_MAX_TOKENS", "160")),
+    "max_seconds": float(os.getenv("CHUNK_MAX_SECONDS", "60")),
+    # Trailing entries of a chunk repeated at the start of the next one
+    "overlap_entries": int(os.getenv("CHUNK_OVERLAP_ENTRIES", "1")),
+    # Start a new chunk whenever the speaker changes
+    "split_on_speaker": os.getenv("CHUNK_SPLIT_ON_SPEAKER", "false").lower() in ("1", "true", "yes"),
+}
+
+# Rough wordpiece count per whitespace word for English speech
+TOKENS_PER_WORD = 1.3
+
+# --- 2. CHUNKING ---
+
+def estimate_tokens(text: str) -> int:
+    return max(1, round(len(text.split()) * TOKENS_PER_WORD))
+
+def merge_entries(entries: list[dict]) -> dict:
+    """Collapses consecutive diarized entries into one, spanning their timestamps."""
+    speakers = list(dict.fromkeys(str(entry.get("speaker_id", "Unknown")) for entry in entries))
+    return {
+        "transcript": " ".join(entry["transcript"].strip() for entry in entries),
+        "speaker_id": ", ".join(speakers),
+        "start_time_seconds": entries[0].get("start_time_seconds", 0),
+        "end_time_seconds": entries[-1].get("end_time_seconds", 0),
+        "entry_count": len(entries),
+    }
+
+def chunk_entries(entries: list[dict], max_tokens: int = CHUNK_CONFIG["max_tokens"],
+                  max_seconds: float = CHUNK_CONFIG["max_seconds"],
+                  overlap_entries: int = CHUNK_CONFIG["overlap_entries"],
+                  split_on_speaker: bool = CHUNK_CONFIG["split_on_speaker"]) -> list[dict]:
+    """
+    Merges adjacent entries into windows of at most `max_tokens` (estimated) and
+    `max_seconds`. A single entry longer than the limits becomes a chunk on its own.
+    Overlap never carries across a speaker boundary when `split_on_speaker` is set.
+    """
+    if max_tokens <= 0:
+        return [dict(entry) for entry in entries]
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for entry in entries:
+        if not entry.get("transcript", "").strip():
+            continue
+        tokens = estimate_tokens(entry["transcript"])
+        speaker_changed = bool(current) and entry.get("speaker_id") != current[-1].get("speaker_id")
+        too_long = bool(current) and (
+            current_tokens + tokens > max_tokens
+            or entry.get("end_time_seconds", 0) - current[0].get("start_time_seconds", 0) > max_seconds
+        )
+        if too_long or (split_on_speaker and speaker_changed):
+            chunks.append(merge_entries(current))
+            carry = current[-overlap_entries:] if overlap_entries and len(current) > overlap_entries else []
+            if split_on_speaker and speaker_changed:
+                carry = []
+            current = list(carry)
+            current_tokens = sum(estimate_tokens(e["transcript"]) for e in current)
+        current.append(entry)
+        current_tokens += tokens
+    if current:
+        chunks.append(merge_entries(current))
+    return chunks
+
+def chunk_transcript(transcript: dict, **limits) -> dict:
+    """Returns a copy of the transcript whose diarized entries are the merged chunks."""
+    entries = (transcript.get("diarized_transcript") or {}).get("entries", [])
+    return {**transcript, "diarized_transcript": {"entries": chunk_entries(entries, **limits)}}
@@ -0,0 +1,117 @@
+# context_packing.py
+
+import os
+
+import numpy as np
+
+from python_helpers.rate_limit import estimate_tokens
+from python_helpers.vector_index import normalize_rows
+
+# --- 1. CONFIGURATION ---
+CONTEXT_CONFIG = {
+    # Prompt tokens the retrieved contexts may take up in total
+    "token_budget": int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200")),
+    # Hits this close in time (seconds) are merged into one context
+    "merge_gap_seconds": float(os.getenv("CONTEXT_MERGE_GAP_SECONDS", "1.0")),
+    # Contexts at least this similar to a more relevant one are dropped; 1 disables
+    "dedup_threshold": float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.92")),
+}
+
+# --- 2. MERGING ---
+
+def join_overlapping(first: str, second: str) -> str:
+    """Concatenates two passages, writing the words where `first` ends as `second` begins only once."""
+    a, b = first.split(), second.split()
+    for size in range(min(len(a), len(b)), 0, -1):
+        if a[-size:] == b[:size]:
+            return " ".join(a + b[size:])
+    return " ".join(a + b)
+
+def unit_vectors(matches: list[dict], encode=None) -> list[np.ndarray | None]:
+    """One unit vector per hit: its returned values, else `encode(text)` (batched), else None."""
+    vectors = [match.get("values") for match in matches]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing and encode is not None:
+        for i, vector in zip(missing, encode([matches[i]["metadata"].get("text", "") for i in missing])):
+            vectors[i] = vector
+    return [None if vector is None else normalize_rows(vector)[0] for vector in vectors]
+
+# --- 3. PACKING ---
+
+def pack_contexts(matches: list[dict], max_contexts: int, encode=None,
+                  token_budget: int = CONTEXT_CONFIG["token_budget"],
+                  dedup_threshold: float = CONTEXT_CONFIG["dedup_threshold"],
+                  merge_gap: float = CONTEXT_CONFIG["merge_gap_seconds"]) -> tuple[list[dict], dict]:
+    """
+    Turns ranked hits into the contexts to send, walking them in relevance order:
+      - a hit overlapping or within `merge_gap` seconds of a chosen context is merged
+        into it, with text shared by overlapping chunks written once;
+      - a hit at least `dedup_threshold` cosine-similar to an earlier one is dropped;
+      - anything else becomes a new context, until there are `max_contexts`.
+    Nothing is added past `token_budget`, except that the most relevant context is
+    always kept (truncated if need be). `encode(texts)` embeds hits returned without
+    vectors; without it, those hits are never treated as duplicates.
+
+    Returns (contexts, report); the report counts the tokens saved versus sending every
+    hit that went into (or was dropped from) the contexts as it is.
+    """
+    vectors = unit_vectors(matches, encode) if dedup_threshold < 1 else [None] * len(matches)
+    contexts = []
+    seen_vectors = []
+    used = 0
+    raw_tokens = 0  # what the same hits would have cost concatenated as they are
+    for match, vector in zip(matches, vectors):
+        metadata = match["metadata"]
+        text = metadata.get("text", "")
+        start, end = metadata.get("start", 0), metadata.get("end", 0)
+        speaker = str(metadata.get("speaker", "Unknown"))
+
+        neighbours = [c for c in contexts if start <= c["end"] + merge_gap and end >= c["start"] - merge_gap]
+        if neighbours:
+            # Join into the most relevant neighbour; a hit bridging two contexts joins them too
+            target = neighbours[0]
+            pieces = sorted([(start, text), *((c["start"], c["text"]) for c in neighbours)])
+            merged = pieces[0][1]
+            for _, piece in pieces[1:]:
+                merged = join_overlapping(merged, piece)
+            extra = estimate_tokens(merged) - sum(estimate_tokens(c["text"]) for c in neighbours)
+            if used + extra > token_budget:
+                continue
+            raw_tokens += estimate_tokens(text)
+            target.update(text=merged, start=min(start, *(c["start"] for c in neighbours)),
+                          end=max(end, *(c["end"] for c in neighbours)))
+            for name in [*speaker.split(", "), *(n for c in neighbours[1:] for n in c["speakers"])]:
+                if name not in target["speakers"]:
+                    target["speakers"].append(name)
+            contexts = [c for c in contexts if not any(c is other for other in neighbours[1:])]
+            used += extra
+        else:
+            if len(contexts) == max_contexts:
+                break
+            tokens = estimate_tokens(text)
+            if vector is not None and seen_vectors and float(np.max(np.stack(seen_vectors) @ vector)) >= dedup_threshold:
+                raw_tokens += tokens
+                continue
+            if used + tokens > token_budget:
+                if contexts:
+                    continue
+                # Keep at least the most relevant context, cut down to the budget
+                text = text[:token_budget * 4]
+                tokens = estimate_tokens(text)
+            raw_tokens += estimate_tokens(metadata.get("text", ""))
+            contexts.append({"text": text, "start": start, "end": end, "speakers": speaker.split(", ")})
+            used += tokens
+        if vector is not None:
+            seen_vectors.append(vector)
+
+    for context in contexts:
+        context["speaker"] = ", ".join(context.pop("speakers"))
+
+    report = {
+        "hits": len(matches),
+        "contexts": len(contexts),
+        "raw_tokens": raw_tokens,
+        "packed_tokens": used,
+        "tokens_saved": max(raw_tokens - used, 0),
+    }
+    return contexts, report
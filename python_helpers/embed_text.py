@@ -1,45 +1,116 @@
-import asyncio
+import os
 import json
-from sentence_transformers import SentenceTransformer
+import time
+import asyncio
+
+import numpy as np
+
+from python_helpers.artifact_cache import config_hash
+from python_helpers.chunking import chunk_transcript
+from python_helpers.embedding_cache import cache_key, normalize_text, get_embedding_cache
+from python_helpers.embedding_service import EMBEDDING_CONFIG, encode_texts
+
+# Running average of model time per text, used to estimate what cache hits saved
+_seconds_per_text = None
 
-print("Loading sentence-transformer model...")
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-print("Model loaded.")
+def _lookup_and_encode(texts: list[str], stats: dict) -> np.ndarray:
+    """Serves cached vectors and encodes each distinct missing text once; repeats count as hits."""
+    global _seconds_per_text
+    cache = get_embedding_cache()
+    if cache is None:
+        return encode_texts(texts)
 
-async def embed(texts: list[str]) -> list[list[float]]:
-    embeddings = await asyncio.to_thread(model.encode, texts)
+    model_key = config_hash(EMBEDDING_CONFIG)
+    keys = [cache_key(model_key, text) for text in texts]
+    vectors = cache.get_many(keys)
+    missing = {key: normalize_text(text) for key, text in zip(keys, texts) if key not in vectors}
+
+    if missing:
+        start = time.perf_counter()
+        encoded = encode_texts(list(missing.values()))
+        elapsed = time.perf_counter() - start
+        fresh = dict(zip(missing, encoded))
+        cache.put_many(fresh)
+        vectors.update(fresh)
+        per_text = elapsed / len(missing)
+        _seconds_per_text = per_text if _seconds_per_text is None else 0.8 * _seconds_per_text + 0.2 * per_text
+
+    hits = len(texts) - len(missing)
+    stats.update({
+        "texts": len(texts),
+        "hits": hits,
+        "encoded": len(missing),
+        "hit_rate": round(hits / len(texts), 3) if texts else 0.0,
+        "seconds_saved": round(hits * _seconds_per_text, 3) if _seconds_per_text else None,
+    })
+    return np.stack([vectors[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+async def embed(texts: list[str], stats: dict | None = None) -> list[list[float]]:
+    """Embeds `texts`, filling `stats` with cache hit/miss counts when given."""
+    embeddings = await asyncio.to_thread(_lookup_and_encode, texts, stats if stats is not None else {})
     return embeddings.tolist()
 
-async def embed_transcript(transcript: dict) -> dict:
+async def embed_transcript(transcript: dict, stats: dict | None = None) -> np.ndarray:
+    """Returns one embedding row per diarized entry, in entry order."""
     entries = transcript["diarized_transcript"]["entries"]
     texts = [entry["transcript"] for entry in entries]
-    embeddings = await embed(texts)
-    
-    for i, emb in enumerate(embeddings):
-        transcript["diarized_transcript"]["entries"][i]["embedding"] = emb
-        
-    return transcript
+    return await asyncio.to_thread(_lookup_and_encode, texts, stats if stats is not None else {})
 
-async def embed_main(transcript_filepath: str) -> str | None:
-    """Reads a JSON file, adds embeddings, and saves to a new file."""
+# --- EMBEDDING ARTIFACT ---
+# Embeddings live next to the transcript JSON as a .npy matrix whose row i belongs to
+# entry i, so they can be memory-mapped instead of parsed out of JSON float lists.
+
+EMBED_STORE_DTYPE = os.getenv("EMBED_STORE_DTYPE", "float32")  # or "float16" to halve the file
+
+def embeddings_path(metadata_path: str) -> str:
+    return os.path.splitext(metadata_path)[0] + ".npy"
+
+def save_embeddings(metadata_path: str, embeddings: np.ndarray) -> str:
+    path = embeddings_path(metadata_path)
+    np.save(path, np.ascontiguousarray(embeddings, dtype=EMBED_STORE_DTYPE))
+    return path
+
+def load_embeddings(metadata_path: str) -> np.ndarray | None:
+    """Memory-maps the sidecar for `metadata_path`; None if it was written in the old inline format."""
+    try:
+        return np.load(embeddings_path(metadata_path), mmap_mode="r")
+    except FileNotFoundError:
+        return None
+
+async def embed_main(transcript_filepath: str, output_filepath: str = "0_embedded_gemini.json",
+                     report: dict | None = None) -> str | None:
+    """
+    Reads a transcript JSON file, merges its entries into chunks and embeds them. Writes
+    the chunked transcript to `output_filepath` and the embeddings to its .npy sidecar.
+    Chunk counts and cache stats go in `report`.
+    """
     if not transcript_filepath:
-        return None  
-    output_filepath = "0_embedded_gemini.json"
+        return None
     
     with open(transcript_filepath, "r") as f:
         transcript = json.load(f)
-        
-    transcript = await embed_transcript(transcript)
+
+    entry_count = len((transcript.get("diarized_transcript") or {}).get("entries", []))
+    transcript = chunk_transcript(transcript)
+    chunk_count = len(transcript["diarized_transcript"]["entries"])
+    print(f"Chunked {entry_count} entries into {chunk_count} chunks")
+    if report is not None:
+        report["chunking"] = {"entries": entry_count, "chunks": chunk_count}
+
+    stats = {}
+    embeddings = await embed_transcript(transcript, stats)
+    if stats.get("texts"):
+        print(f"Embedding cache: {stats['hits']}/{stats['texts']} hits, encoded {stats['encoded']}")
+        if report is not None:
+            report["embedding_cache"] = stats
     
+    save_embeddings(output_filepath, embeddings)
     with open(output_filepath, "w") as f:
-        json.dump(transcript, f, indent=2)
+        json.dump(transcript, f)
         
-    print(f"Saved to {output_filepath}")
+    print(f"Saved to {output_filepath} and {embeddings_path(output_filepath)}")
     return output_filepath
 
 
 if __name__ == "__main__":
     asyncio.run(embed_main())
-
-
-    
\ No newline at end of file
@@ -0,0 +1,129 @@
+# embedding_cache.py
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import unicodedata
+
+import numpy as np
+
+# --- 1. CONFIGURATION ---
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "true").lower() in ("1", "true", "yes")
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH", os.path.join(tempfile.gettempdir(), "yt-vid-talker-embeddings.sqlite3")
+)
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(512 * 1024**2)))
+
+# SQLite caps the number of bound parameters per statement
+LOOKUP_BATCH = 500
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# --- 2. KEYS ---
+
+def normalize_text(text: str) -> str:
+    """Collapses Unicode forms and whitespace so trivially different copies share a key."""
+    return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def cache_key(model_key: str, text: str) -> str:
+    return hashlib.sha256(f"{model_key}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+# --- 3. CACHE ---
+
+class EmbeddingCache:
+    """
+    Disk-backed map from (model, normalized text) to a float32 vector, stored as raw
+    bytes in SQLite. Every lookup refreshes a row's `last_used`, and writes evict the
+    least recently used rows once the stored vectors exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_bytes: int = EMBED_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        self._stored_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """Returns the cached vectors for whichever of `keys` are present."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique_keys), LOOKUP_BATCH):
+                batch = unique_keys[i:i + LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._db.commit()
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]):
+        """Stores vectors as float32, then evicts down to the size limit."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._stored_bytes += sum(len(blob) for _, blob, _ in rows)
+            if self._stored_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Recount first: replaced rows were counted twice on the way in
+        self._stored_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        excess = self._stored_bytes - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        ):
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self._stored_bytes -= freed
+        print(f"Evicted {len(doomed)} cached embeddings ({freed} bytes)")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Opens the shared cache on first use; None when EMBED_CACHE is off."""
+    global _cache
+    if not EMBED_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,123 @@
+# embedding_service.py
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from python_helpers.metrics import span, increment
+
+# --- 1. CONFIGURATION ---
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 keeps torch's default
+EMBED_NORMALIZE = os.getenv("EMBED_NORMALIZE", "false").lower() in ("1", "true", "yes")
+# How long a query waits for others to share its forward pass
+EMBED_MICROBATCH_WAIT_MS = float(os.getenv("EMBED_MICROBATCH_WAIT_MS", "5"))
+
+# Everything that changes the vectors, for cache keys
+EMBEDDING_CONFIG = {"model": EMBEDDING_MODEL_NAME, "normalize": EMBED_NORMALIZE}
+
+# --- 2. SHARED MODEL ---
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Loads the SentenceTransformer once per process, on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                if EMBED_THREADS:
+                    torch.set_num_threads(EMBED_THREADS)
+                print("Loading sentence-transformer model...")
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+                print("Model loaded.")
+    return _model
+
+def warmup_in_background() -> threading.Thread:
+    """Starts loading the model on a daemon thread so the first request does not pay for it."""
+    thread = threading.Thread(target=get_model, name="embedding-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def encode_texts(texts: list[str]) -> np.ndarray:
+    """Encodes texts in batches of EMBED_BATCH_SIZE. Returns a float32 matrix, one row per text."""
+    model = get_model()
+    increment("model.encoded_texts", len(texts))
+    with span("model.encode"):
+        return model.encode(
+            texts,
+            batch_size=EMBED_BATCH_SIZE,
+            normalize_embeddings=EMBED_NORMALIZE,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+# --- 3. QUERY MICRO-BATCHING ---
+
+class MicroBatcher:
+    """
+    Coalesces single-text encode requests arriving from many threads into one batched
+    forward pass. A worker thread takes the first waiting request, gathers whatever else
+    arrives within `max_wait` seconds (up to `max_batch`), and encodes them together.
+    """
+
+    def __init__(self, max_batch: int = EMBED_BATCH_SIZE, max_wait: float = EMBED_MICROBATCH_WAIT_MS / 1000):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """Queues `text`; the future resolves to its embedding. Async callers can wrap it with asyncio.wrap_future."""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = encode_texts([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+
+query_batcher = MicroBatcher()
+
+def encode_query(text: str) -> np.ndarray:
+    """Encodes one query, sharing a forward pass with any concurrent queries."""
+    with span("query.embed"):
+        return query_batcher.encode(text)
@@ -0,0 +1,201 @@
+# jobs.py
+
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+from contextlib import contextmanager, asynccontextmanager, nullcontext
+
+from python_helpers.metrics import record, collect_spans
+
+# --- 1. CONFIGURATION ---
+JOBS_ROOT = os.getenv("JOBS_ROOT", os.path.join(tempfile.gettempdir(), "yt-vid-talker-jobs"))
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+JOB_STAGES = ["download", "transcribe", "embed", "upsert"]
+# How many jobs may be in each stage at once, across all jobs, so one video can embed
+# while others download or wait on Sarvam
+STAGE_CONCURRENCY = {
+    "download": int(os.getenv("DOWNLOAD_CONCURRENCY", "3")),
+    "transcribe": int(os.getenv("TRANSCRIBE_CONCURRENCY", "4")),
+    "embed": int(os.getenv("EMBED_CONCURRENCY", "1")),
+    "upsert": int(os.getenv("UPSERT_CONCURRENCY", "2")),
+}
+# Pipelines in flight, i.e. workspaces on disk. The stage limits bound the actual work, so
+# by default every stage can be full at once; a lower cap would leave stages idle while
+# the jobs holding all the slots wait on another stage (e.g. a long Sarvam job)
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", str(sum(STAGE_CONCURRENCY.values()))))
+
+# --- 2. JOB STATE ---
+
+class Job:
+    """Tracks a single video pipeline run and its isolated workspace."""
+
+    def __init__(self, url: str, stage_slots: dict | None = None, batch_id: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.batch_id = batch_id
+        self.status = "queued"  # queued | running | completed | failed
+        self.stage = None
+        self.waiting_for = None  # stage whose concurrency limit the job is queued behind
+        self._stage_slots = stage_slots or {}
+        self.workspace = os.path.join(JOBS_ROOT, self.id)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.timings = {}
+        self.spans = {}  # span name -> {"count", "seconds"} for everything this job called
+        self.result = {}
+        self.error = None
+
+    @property
+    def progress(self) -> float:
+        done = sum(1 for stage in JOB_STAGES if stage in self.timings)
+        return round(done / len(JOB_STAGES), 2)
+
+    @contextmanager
+    def track(self, stage: str):
+        """Marks `stage` as current and records its wall time once it succeeds."""
+        self.stage = stage
+        start = time.perf_counter()
+        yield
+        self.timings[stage] = round(time.perf_counter() - start, 3)
+        record(f"stage.{stage}", self.timings[stage])
+
+    @asynccontextmanager
+    async def run_stage(self, stage: str, wait: bool = True):
+        """
+        Tracks `stage` once one of its slots (shared by all jobs) is free. Pass wait=False
+        when the stage will only be served from cache, so it does not queue behind real work.
+        """
+        slots = self._stage_slots.get(stage) if wait else None
+        self.waiting_for = stage
+        start = time.perf_counter()
+        async with slots or nullcontext():
+            self.waiting_for = None
+            record(f"stage_wait.{stage}", time.perf_counter() - start)
+            with self.track(stage):
+                yield
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "url": self.url,
+            "status": self.status,
+            "stage": self.stage,
+            "waiting_for": self.waiting_for,
+            "progress": self.progress,
+            "timings": self.timings,
+            "spans": self.spans,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class Batch:
+    """A set of jobs submitted together (a URL list or an expanded playlist)."""
+
+    def __init__(self, job_ids: list[str], source: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.job_ids = job_ids
+        self.source = source
+        self.created_at = time.time()
+
+    def to_dict(self, jobs: dict[str, Job]) -> dict:
+        members = [jobs[job_id] for job_id in self.job_ids if job_id in jobs]
+        statuses = {status: 0 for status in ("queued", "running", "completed", "failed")}
+        stages = {stage: 0 for stage in JOB_STAGES}
+        for job in members:
+            statuses[job.status] += 1
+            if job.status == "running" and job.stage in stages and not job.waiting_for:
+                stages[job.stage] += 1
+        finished = statuses["completed"] + statuses["failed"]
+        return {
+            "batch_id": self.id,
+            "source": self.source,
+            "status": "completed" if finished == len(members) else "running",
+            "videos": len(self.job_ids),
+            "progress": round(sum(job.progress for job in members) / len(members), 2) if members else 1.0,
+            "counts": statuses,
+            "active_stages": stages,
+            "created_at": self.created_at,
+            "jobs": [
+                {key: job_dict[key] for key in ("job_id", "url", "status", "stage", "waiting_for", "progress", "timings", "error")}
+                for job_dict in (job.to_dict() for job in members)
+            ],
+        }
+
+# --- 3. JOB MANAGER ---
+
+class JobManager:
+    """Runs pipelines in the background with at most `max_workers` at a time."""
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_JOBS, stage_concurrency: dict = STAGE_CONCURRENCY):
+        self.jobs: dict[str, Job] = {}
+        self.batches: dict[str, Batch] = {}
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._stage_slots = {stage: asyncio.Semaphore(limit) for stage, limit in stage_concurrency.items()}
+        self._tasks = set()
+
+    def submit(self, url: str, pipeline, batch_id: str | None = None) -> Job:
+        """Queues `pipeline(job)` and returns the job immediately."""
+        job = Job(url, self._stage_slots, batch_id)
+        self.jobs[job.id] = job
+        self._prune()
+        task = asyncio.create_task(self._run(job, pipeline))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def submit_batch(self, urls: list[str], pipeline, source: str | None = None) -> Batch:
+        """Queues one job per URL; their stages interleave under the shared stage limits."""
+        batch = Batch([], source)
+        self.batches[batch.id] = batch
+        for url in urls:
+            batch.job_ids.append(self.submit(url, pipeline, batch.id).id)
+        return batch
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Batch | None:
+        return self.batches.get(batch_id)
+
+    async def _run(self, job: Job, pipeline):
+        async with self._semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            os.makedirs(job.workspace, exist_ok=True)
+            try:
+                with collect_spans(job.spans):
+                    job.result = await pipeline(job) or {}
+                job.status = "completed"
+                job.stage = None
+            except Exception as e:
+                print(f"❌ Job {job.id} failed during {job.stage}: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+
+    def _prune(self):
+        """Drops the oldest finished jobs (and their workspaces) past the history limit."""
+        # Jobs of a batch still in progress are kept so the batch can report on all of them
+        active_batches = {
+            job.batch_id for job in self.jobs.values()
+            if job.batch_id and job.status in ("queued", "running")
+        }
+        finished = [
+            j for j in self.jobs.values()
+            if j.status in ("completed", "failed") and j.batch_id not in active_batches
+        ]
+        excess = len(self.jobs) - JOB_HISTORY_LIMIT
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(excess, 0)]:
+            shutil.rmtree(job.workspace, ignore_errors=True)
+            del self.jobs[job.id]
+        for batch_id in [b for b, batch in self.batches.items()
+                         if batch.job_ids and not any(j in self.jobs for j in batch.job_ids)]:
+            del self.batches[batch_id]
@@ -0,0 +1,154 @@
+# lexical_index.py
+
+import os
+import re
+import json
+import shutil
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# --- 1. CONFIGURATION ---
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "./lexical_index")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+DEFAULT_NAMESPACE = "__default__"
+
+# Words, plus numbers and names with inner dots, hyphens or apostrophes ("3.5", "gpt-4", "don't")
+TOKEN_PATTERN = re.compile(r"\w+(?:[.'\-]\w+)*")
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+# --- 2. BM25 INDEX ---
+
+class LexicalIndex:
+    """
+    Per-video BM25 index stored as CSR-style postings:
+
+      vocab.json    term -> term id
+      offsets.npy   int64, postings of term t are rows offsets[t]:offsets[t+1]
+      docs.npy      int32 document (entry) row of each posting
+      weights.npy   float32 precomputed BM25 weight of each posting
+      records.json  id and metadata per document row
+
+    Weights are fixed at build time, so a query only sums the postings of its terms.
+    The arrays are loaded memory-mapped and kept per video until it is rebuilt.
+    """
+
+    def __init__(self, root: str = LEXICAL_INDEX_DIR, k1: float = BM25_K1, b: float = BM25_B):
+        self.root = root
+        self.k1 = k1
+        self.b = b
+        self._videos = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, namespace: str) -> str:
+        return os.path.join(self.root, namespace or DEFAULT_NAMESPACE)
+
+    def build(self, namespace: str, records: list[dict]):
+        """Indexes records given as {"id", "metadata"} dicts, whose metadata["text"] is searched."""
+        term_ids = {}
+        posting_terms, posting_docs, posting_tfs = [], [], []
+        lengths = np.zeros(len(records), dtype=np.float32)
+        for doc, record in enumerate(records):
+            tokens = tokenize(record["metadata"].get("text", ""))
+            lengths[doc] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+                posting_docs.append(doc)
+                posting_tfs.append(tf)
+
+        # Group postings by term (stable, so documents stay in order) and weight them all at once
+        terms = np.asarray(posting_terms, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        docs = np.asarray(posting_docs, dtype=np.int32)[order]
+        tfs = np.asarray(posting_tfs, dtype=np.float32)[order]
+        document_frequency = np.bincount(terms, minlength=len(term_ids))
+        offsets = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+        idf = np.log(1 + (len(records) - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = float(lengths.mean()) if len(records) else 0.0
+        norm = self.k1 * (1 - self.b + self.b * lengths[docs] / (average_length or 1.0))
+        weights = (idf[terms] * tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+
+        # Build beside the live index, then swap it in
+        directory = self._dir(namespace)
+        staging = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(staging, exist_ok=True)
+        np.save(os.path.join(staging, "offsets.npy"), offsets)
+        np.save(os.path.join(staging, "docs.npy"), docs)
+        np.save(os.path.join(staging, "weights.npy"), weights)
+        with open(os.path.join(staging, "vocab.json"), "w") as f:
+            json.dump(term_ids, f)
+        with open(os.path.join(staging, "records.json"), "w") as f:
+            json.dump([{"id": r["id"], "metadata": r.get("metadata", {})} for r in records], f)
+
+        with self._lock:
+            retired = f"{directory}.old-{os.getpid()}-{threading.get_ident()}"
+            if os.path.exists(directory):
+                os.replace(directory, retired)
+            os.replace(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+            self._videos.pop(namespace or DEFAULT_NAMESPACE, None)
+
+    def _load(self, namespace: str):
+        namespace = namespace or DEFAULT_NAMESPACE
+        with self._lock:
+            if namespace not in self._videos:
+                directory = self._dir(namespace)
+                try:
+                    with open(os.path.join(directory, "vocab.json"), "r") as f:
+                        vocab = json.load(f)
+                    with open(os.path.join(directory, "records.json"), "r") as f:
+                        records = json.load(f)
+                    arrays = tuple(np.load(os.path.join(directory, name), mmap_mode="r")
+                                   for name in ("offsets.npy", "docs.npy", "weights.npy"))
+                except FileNotFoundError:
+                    return None
+                self._videos[namespace] = (vocab, records, *arrays)
+            return self._videos[namespace]
+
+    def query(self, text: str, top_k: int = 5, namespace: str = "") -> dict:
+        """Returns the `top_k` best BM25 matches, shaped like a Pinecone query result."""
+        loaded = self._load(namespace)
+        if loaded is None:
+            return {"matches": []}
+        vocab, records, offsets, docs, weights = loaded
+
+        scores = np.zeros(len(records), dtype=np.float32)
+        for term in set(tokenize(text)):
+            term_id = vocab.get(term)
+            if term_id is not None:
+                start, end = offsets[term_id], offsets[term_id + 1]
+                # A term lists each document at most once, so plain fancy-index addition is safe
+                scores[docs[start:end]] += weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return {"matches": []}
+        k = min(top_k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return {"matches": [
+            {"id": records[row]["id"], "score": float(scores[row]), "metadata": records[row]["metadata"]}
+            for row in top
+        ]}
+
+# --- 3. FUSION ---
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], k: int = 60) -> list[dict]:
+    """
+    Merges ranked match lists by summing 1 / (k + rank) per id. The first list a match
+    appears in supplies its metadata; the fused score replaces the original ones.
+    """
+    fused = {}
+    scores = defaultdict(float)
+    for matches in result_lists:
+        for rank, match in enumerate(matches):
+            fused.setdefault(match["id"], match)
+            scores[match["id"]] += 1.0 / (k + rank + 1)
+    ranked = sorted(fused, key=lambda match_id: scores[match_id], reverse=True)
+    return [{**fused[match_id], "score": scores[match_id]} for match_id in ranked]
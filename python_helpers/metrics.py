@@ -0,0 +1,107 @@
+# metrics.py
+
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from collections import defaultdict
+
+# --- 1. CONFIGURATION ---
+METRICS_PREFIX = "ytvt"
+# Seconds; wide enough for a cached lookup and for a long transcription wait
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# --- 2. PROCESS-WIDE REGISTRY ---
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+_lock = threading.Lock()
+_histograms = defaultdict(Histogram)   # span name -> latency histogram
+_errors = defaultdict(int)             # span name -> spans that raised
+_counters = defaultdict(float)         # event name -> running total
+
+# Spans recorded while this is set are also summed into it (per job or per request)
+_breakdown = contextvars.ContextVar("metrics_breakdown", default=None)
+
+def record(name: str, seconds: float, error: bool = False):
+    """Records one timed span into the histograms and the current breakdown, if any."""
+    with _lock:
+        _histograms[name].observe(seconds)
+        if error:
+            _errors[name] += 1
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            entry = breakdown.setdefault(name, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] = round(entry["seconds"] + seconds, 4)
+
+def increment(name: str, amount: float = 1):
+    with _lock:
+        _counters[name] += amount
+
+@contextmanager
+def span(name: str):
+    """Times the enclosed block (sync or async code) as span `name`, flagging it if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record(name, time.perf_counter() - start, error=True)
+        raise
+    record(name, time.perf_counter() - start)
+
+@contextmanager
+def collect_spans(breakdown: dict | None = None):
+    """
+    Sums every span recorded inside the block (including in tasks and to_thread calls
+    started from it, which inherit the context) into `breakdown`, which is yielded.
+    """
+    breakdown = {} if breakdown is None else breakdown
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+# --- 3. EXPOSITION ---
+
+def render_prometheus() -> str:
+    """Renders every metric in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {METRICS_PREFIX}_span_seconds Duration of pipeline stages and external calls.",
+        f"# TYPE {METRICS_PREFIX}_span_seconds histogram",
+    ]
+    with _lock:
+        for name, histogram in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f'{METRICS_PREFIX}_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRICS_PREFIX}_span_seconds_sum{{span="{name}"}} {histogram.sum:.6f}')
+            lines.append(f'{METRICS_PREFIX}_span_seconds_count{{span="{name}"}} {histogram.count}')
+
+        lines += [
+            f"# HELP {METRICS_PREFIX}_span_errors_total Spans that ended in an exception.",
+            f"# TYPE {METRICS_PREFIX}_span_errors_total counter",
+        ]
+        for name, count in sorted(_errors.items()):
+            lines.append(f'{METRICS_PREFIX}_span_errors_total{{span="{name}"}} {count}')
+
+        lines += [
+            f"# HELP {METRICS_PREFIX}_events_total Counted events (retries, cache hits, items processed).",
+            f"# TYPE {METRICS_PREFIX}_events_total counter",
+        ]
+        for name, total in sorted(_counters.items()):
+            lines.append(f'{METRICS_PREFIX}_events_total{{event="{name}"}} {total:g}')
+    return "\n".join(lines) + "\n"
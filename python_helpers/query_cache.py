@@ -0,0 +1,126 @@
+# query_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from python_helpers.embedding_cache import normalize_text
+from python_helpers.embedding_service import encode_query, encode_texts
+
+# --- 1. CONFIGURATION ---
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "true").lower() in ("1", "true", "yes")
+# Minimum cosine similarity between two questions for one to reuse the other's answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_PER_VIDEO = int(os.getenv("ANSWER_CACHE_PER_VIDEO", "64"))
+ANSWER_CACHE_MAX_VIDEOS = int(os.getenv("ANSWER_CACHE_MAX_VIDEOS", "256"))
+
+# --- 2. QUERY EMBEDDINGS ---
+
+_query_vectors = OrderedDict()  # normalized query -> read-only vector, least recently used first
+_query_vectors_lock = threading.Lock()
+
+def _query_key(query: str) -> str:
+    return normalize_text(query).lower()
+
+def _cached_vectors(keys: list[str]) -> dict[str, np.ndarray]:
+    with _query_vectors_lock:
+        found = {}
+        for key in keys:
+            if key in _query_vectors:
+                _query_vectors.move_to_end(key)
+                found[key] = _query_vectors[key]
+        return found
+
+def _remember(key: str, vector: np.ndarray) -> np.ndarray:
+    vector.setflags(write=False)
+    with _query_vectors_lock:
+        _query_vectors[key] = vector
+        while len(_query_vectors) > QUERY_EMBED_CACHE_SIZE:
+            _query_vectors.popitem(last=False)
+    return vector
+
+def embed_query_cached(query: str) -> np.ndarray:
+    """Query embedding, served from an in-process LRU for repeated questions."""
+    key = _query_key(query)
+    if cached := _cached_vectors([key]):
+        return cached[key]
+    return _remember(key, encode_query(key))
+
+def embed_queries_cached(queries: list[str]) -> list[np.ndarray]:
+    """Like embed_query_cached for many queries, encoding all the uncached ones in one forward pass."""
+    keys = [_query_key(query) for query in queries]
+    vectors = _cached_vectors(keys)
+    missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+    if missing:
+        for key, vector in zip(missing, encode_texts(missing)):
+            vectors[key] = _remember(key, vector)
+    return [vectors[key] for key in keys]
+
+# --- 3. SEMANTIC ANSWER CACHE ---
+
+class SemanticAnswerCache:
+    """
+    Per-video store of answered questions. A new question reuses a stored answer when
+    its embedding is within `threshold` cosine similarity of one already answered.
+    Each video keeps its `per_video` most recently used answers, and whole videos are
+    dropped least-recently-used beyond `max_videos`.
+
+    `invalidate` bumps the video's generation, so answers computed against the
+    previous ingest (including ones still streaming) are never stored.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, per_video: int = ANSWER_CACHE_PER_VIDEO,
+                 max_videos: int = ANSWER_CACHE_MAX_VIDEOS):
+        self.threshold = threshold
+        self.per_video = per_video
+        self.max_videos = max_videos
+        self._videos = OrderedDict()  # video_id -> list of (unit_vector, top_k, answer, contexts)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, video_id: str) -> int:
+        with self._lock:
+            return self._generations.get(video_id, 0)
+
+    def lookup(self, video_id: str, embedding: np.ndarray, top_k: int) -> tuple[str, list] | None:
+        """Returns (answer, contexts) of the closest answered question, if close enough."""
+        unit = embedding / (np.linalg.norm(embedding) or 1.0)
+        with self._lock:
+            entries = self._videos.get(video_id)
+            if not entries:
+                return None
+            candidates = [i for i, entry in enumerate(entries) if entry[1] == top_k]
+            if not candidates:
+                return None
+            scores = np.stack([entries[i][0] for i in candidates]) @ unit
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            entry = entries.pop(candidates[best])
+            entries.append(entry)
+            self._videos.move_to_end(video_id)
+            return entry[2], entry[3]
+
+    def store(self, video_id: str, embedding: np.ndarray, top_k: int, answer: str, contexts: list,
+              generation: int):
+        """Stores an answer, unless the video was re-ingested since `generation` was read."""
+        unit = embedding / (np.linalg.norm(embedding) or 1.0)
+        with self._lock:
+            if self._generations.get(video_id, 0) != generation:
+                return
+            entries = self._videos.setdefault(video_id, [])
+            entries.append((unit, top_k, answer, contexts))
+            del entries[:-self.per_video]
+            self._videos.move_to_end(video_id)
+            while len(self._videos) > self.max_videos:
+                self._videos.popitem(last=False)
+
+    def invalidate(self, video_id: str):
+        with self._lock:
+            self._videos.pop(video_id, None)
+            self._generations[video_id] = self._generations.get(video_id, 0) + 1
+
+answer_cache = SemanticAnswerCache()
@@ -3,31 +3,66 @@
 import os
 import json
 import time
+import contextvars
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
-import pinecone
-from groq import Groq
-from sentence_transformers import SentenceTransformer
-from typing import Generator
+from typing import Generator, Callable
+
+import numpy as np
+
+from python_helpers.vector_index import LocalVectorIndex
+from python_helpers.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from python_helpers.context_packing import CONTEXT_CONFIG, pack_contexts
+from python_helpers.embedding_service import encode_texts
+from python_helpers.embed_text import load_embeddings
+from python_helpers.query_cache import ANSWER_CACHE_ENABLED, answer_cache, embed_query_cached, embed_queries_cached
+from python_helpers.rate_limit import RateLimiter, groq_limiter, invoke_limited, estimate_tokens, GROQ_COMPLETION_TOKENS
+from python_helpers.metrics import span, record, increment
 
 # --- 1. INITIALIZATION ---
 
 load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# "pinecone" (default) or "local" for the embedded NumPy index
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "pinecone")
 
-if not PINECONE_API_KEY or not GROQ_API_KEY:
-    raise ValueError("PINECONE_API_KEY and GROQ_API_KEY must be set in the .env file")
+# Clients are built on first use, so importing this module is cheap and does not need keys
+@lru_cache(maxsize=1)
+def get_pinecone_client():
+    if not PINECONE_API_KEY:
+        raise ValueError("PINECONE_API_KEY must be set in the .env file (or set VECTOR_INDEX_BACKEND=local)")
+    import pinecone
+    return pinecone.Pinecone(api_key=PINECONE_API_KEY)
 
-# Initialize clients
-pc = pinecone.Pinecone(api_key=PINECONE_API_KEY)
-groq_client = Groq(api_key=GROQ_API_KEY)
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+@lru_cache(maxsize=1)
+def get_groq_client():
+    if not GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY must be set in the .env file")
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY)
 
 # --- 2. CONFIGURATION ---
 PINECONE_INDEX_NAME = "youtube-transcript-rag"
 MODEL_DIMENSION = 384
 GROQ_LLM_MODEL = "llama-3.1-8b-instant"
+# Fuse BM25 keyword search with vector search; each side contributes this many candidates per result
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+HYBRID_CANDIDATES_PER_RESULT = int(os.getenv("HYBRID_CANDIDATES_PER_RESULT", "4"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+lexical_index = LexicalIndex()
+# Runs the keyword search alongside the vector query
+search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+# Questions from one /api/ask-questions request answered at once (Groq calls are still rate-limited)
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+batch_executor = ThreadPoolExecutor(max_workers=ASK_BATCH_CONCURRENCY, thread_name_prefix="ask-batch")
+# Answers sleep on the Groq limiter in their threads, so they get their own pool; on asyncio's
+# default executor a queue of questions would stall downloads, cache I/O and upserts
+ANSWER_CONCURRENCY = int(os.getenv("ANSWER_CONCURRENCY", "16"))
+answer_executor = ThreadPoolExecutor(max_workers=ANSWER_CONCURRENCY, thread_name_prefix="groq-answer")
 
 def convert_to_timestamp(seconds: float) -> str:
     """Converts seconds to a HH:MM:SS timestamp format."""
@@ -36,10 +71,42 @@ def convert_to_timestamp(seconds: float) -> str:
     seconds = int(seconds % 60)
     return f"{hours:02}:{minutes:02}:{seconds:02}"
 
-# --- 3. CORE PINECODE FUNCTIONS ---
+# --- 3. CORE INDEX FUNCTIONS ---
+
+def setup_vector_index():
+    """Returns the index for the configured backend; both expose the same Pinecone-style API."""
+    if VECTOR_INDEX_BACKEND == "local":
+        return LocalVectorIndex(dimension=MODEL_DIMENSION)
+    if VECTOR_INDEX_BACKEND == "pinecone":
+        return setup_pinecone_index()
+    raise ValueError(f"Unknown VECTOR_INDEX_BACKEND: {VECTOR_INDEX_BACKEND}")
+
+def namespace_vector_count(index, namespace: str) -> int:
+    """Returns how many vectors the index currently reports for `namespace`."""
+    if isinstance(index, LocalVectorIndex):
+        # Stats for every namespace would mean reading one file per video ever ingested
+        return index.vector_count(namespace)
+    summary = index.describe_index_stats()['namespaces'].get(namespace)
+    return summary['vector_count'] if summary else 0
+
+def wait_for_namespace_count(index, namespace: str, expected: int, timeout: float = 60.0) -> bool:
+    """Polls index stats until `namespace` holds `expected` vectors, backing off between checks."""
+    delay = 0.25
+    deadline = time.monotonic() + timeout
+    while True:
+        count = namespace_vector_count(index, namespace)
+        if count == expected:
+            return True
+        if time.monotonic() >= deadline:
+            print(f"⚠️ Namespace '{namespace}' reports {count} vectors after {timeout}s (expected {expected}).")
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 5.0)
 
 def setup_pinecone_index():
     """Checks if the Pinecone index exists and creates it if it doesn't."""
+    import pinecone
+    pc = get_pinecone_client()
     if PINECONE_INDEX_NAME not in pc.list_indexes().names():
         print(f"Index '{PINECONE_INDEX_NAME}' not found. Creating it...")
         pc.create_index(
@@ -49,19 +116,22 @@ def setup_pinecone_index():
             spec=pinecone.ServerlessSpec(cloud='aws', region='us-east-1')
         )
         print("Waiting for index to initialize...")
-        time.sleep(15)
+        delay = 0.5
+        while not pc.describe_index(PINECONE_INDEX_NAME).status['ready']:
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
     
     return pc.Index(PINECONE_INDEX_NAME)
 
-def load_and_upsert_data(index, filepath: str):
-    """Loads data from the JSON file and upserts it into the Pinecone index."""
-    stats = index.describe_index_stats()
-    if stats['total_vector_count'] > 0:
-        print("Index already contains data. Clearing existing vectors...")
-        index.delete(delete_all=True)
-        print("Waiting for index to clear...")
-        time.sleep(10)
+def vector_id(video_id: str, i: int) -> str:
+    return f"{video_id}#entry_{i}"
 
+def load_and_upsert_data(index, filepath: str, video_id: str):
+    """
+    Loads data from the JSON file (and its memory-mapped .npy embeddings) and upserts it
+    into the video's own namespace. Ids are deterministic per entry, so re-ingesting a
+    video overwrites its vectors in place and never touches other videos.
+    """
     try:
         with open(filepath, "r") as f:
             transcript_data = json.load(f)
@@ -70,18 +140,26 @@ def load_and_upsert_data(index, filepath: str):
         return False
 
     entries = transcript_data.get("diarized_transcript", {}).get("entries", [])
+    embeddings = load_embeddings(filepath)
+    # The local index takes NumPy rows straight from the memory map; Pinecone needs lists
+    is_local = isinstance(index, LocalVectorIndex)
     vectors_to_upsert = []
     for i, entry in enumerate(entries):
-        if "embedding" in entry and "transcript" in entry:
+        if embeddings is not None:
+            values = embeddings[i] if is_local else embeddings[i].astype(np.float32).tolist()
+        else:
+            values = entry.get("embedding")
+        if values is not None and "transcript" in entry:
             metadata = {
+                "video_id": video_id,
                 "text": entry["transcript"],
                 "speaker": entry.get("speaker_id", "Unknown"),
                 "start": entry.get("start_time_seconds", 0),
                 "end": entry.get("end_time_seconds", 0)
             }
             vectors_to_upsert.append({
-                "id": f"entry_{i}",
-                "values": entry["embedding"],
+                "id": vector_id(video_id, i),
+                "values": values,
                 "metadata": metadata
             })
 
@@ -89,73 +167,248 @@ def load_and_upsert_data(index, filepath: str):
         print("No vectors to upsert.")
         return False
 
-    print(f"Upserting {len(vectors_to_upsert)} vectors to Pinecone index...")
-    for i in range(0, len(vectors_to_upsert), 100):
-        batch = vectors_to_upsert[i:i+100]
-        index.upsert(vectors=batch)
-    
-    print("Upsert complete. Waiting for index to update...")
-    time.sleep(10)
+    previous_count = namespace_vector_count(index, video_id)
+    print(f"Upserting {len(vectors_to_upsert)} vectors to namespace '{video_id}'...")
+    # The local index rewrites the namespace on every call, so it gets everything at once
+    batch_size = len(vectors_to_upsert) if is_local else 100
+    with span("index.upsert"):
+        for i in range(0, len(vectors_to_upsert), batch_size):
+            batch = vectors_to_upsert[i:i+batch_size]
+            index.upsert(vectors=batch, namespace=video_id)
+
+    # A previous ingest of this video may have produced more entries; drop the leftovers
+    if previous_count > len(entries):
+        stale_ids = [vector_id(video_id, i) for i in range(len(entries), previous_count)]
+        for i in range(0, len(stale_ids), 1000):
+            index.delete(ids=stale_ids[i:i+1000], namespace=video_id)
+
+    print("Upsert complete. Waiting for index to report the new vectors...")
+    with span("index.visibility_wait"):
+        wait_for_namespace_count(index, video_id, len(vectors_to_upsert))
+    with span("lexical.build"):
+        lexical_index.build(video_id, [{"id": v["id"], "metadata": v["metadata"]} for v in vectors_to_upsert])
+    # Answers cached for the previous ingest may cite contexts that no longer exist
+    answer_cache.invalidate(video_id)
     return True
 
-def get_groq_response_streamed(query: str, context: str) -> Generator[str, None, None]:
-    """Generates a streaming answer from Groq based on query and context."""
-    
+def answer_messages(query: str, context: str) -> list[dict]:
     system_prompt = """
     You are a helpful assistant who answers questions based on the provided video transcript context.
     - Answer the question directly using only the information from the CONTEXT below.
     - Cite the context you are using by referencing its number, like `[0]`, `[1]`, etc.
     - If the context does not contain the answer, state "I cannot answer this question based on the provided transcript.
-    """ # Your system prompt remains the same
+    """
     user_prompt = f"CONTEXT:\n{context}\n\nQUESTION:\n{query}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
-    try:
-        stream = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+def get_groq_response_streamed(query: str, context: str,
+                               on_complete: Callable[[str], None] | None = None,
+                               limiter: RateLimiter = groq_limiter) -> Generator[str, None, None]:
+    """
+    Generates a streaming answer from Groq based on query and context. Opening the stream
+    is paced by `limiter` and retried on 429. `on_complete` receives the full answer only
+    if the completion finished without error.
+    """
+    messages = answer_messages(query, context)
+    stream = None
+    start = time.perf_counter()
+
+    def open_stream():
+        nonlocal start
+        start = time.perf_counter()  # time to first token excludes the rate limiter's wait
+        return get_groq_client().chat.completions.create(
+            messages=messages,
             model=GROQ_LLM_MODEL,
             temperature=0.2,
             stream=True, # Enable streaming
         )
+
+    try:
+        tokens = estimate_tokens(messages[0]["content"] + messages[1]["content"]) + GROQ_COMPLETION_TOKENS
+        stream = invoke_limited(open_stream, tokens, limiter)
         
         # Yield each chunk of content as it arrives
+        parts = []
         for chunk in stream:
             if content := chunk.choices[0].delta.content:
+                if not parts:
+                    record("groq.ttft", time.perf_counter() - start)
+                parts.append(content)
                 yield content
+        record("groq.completion", time.perf_counter() - start)
+        if on_complete is not None:
+            on_complete("".join(parts))
 
     except Exception as e:
+        record("groq.completion", time.perf_counter() - start, error=True)
         yield f"An error occurred while generating a response from Groq: {e}"
+    finally:
+        # Closing the generator early (e.g. the client went away) drops the upstream completion
+        if stream is not None:
+            stream.close()
+
+def get_groq_answer(query: str, context: str, limiter: RateLimiter = groq_limiter) -> str:
+    """Whole (non-streamed) answer, paced by `limiter` and retried on 429."""
+    messages = answer_messages(query, context)
+
+    def complete():
+        with span("groq.completion"):
+            response = get_groq_client().chat.completions.create(
+                messages=messages, model=GROQ_LLM_MODEL, temperature=0.2,
+            )
+        return response.choices[0].message.content
+
+    tokens = estimate_tokens(messages[0]["content"] + messages[1]["content"]) + GROQ_COMPLETION_TOKENS
+    return invoke_limited(complete, tokens, limiter)
 
 # --- 4. RAG QUERY FUNCTIONS ---
 
-def query_video(index, query: str, top_k: int = 5):
-    """Retrieves context and calls the streaming generator for the answer."""
-    # 1. Retrieve context from Pinecone (this part is unchanged)
-    query_embedding = model.encode(query).tolist()
-    query_result = index.query(
-        vector=query_embedding, top_k=top_k, include_metadata=True
-    )
-    matches = query_result.get('matches', [])
+NO_CONTEXT_ANSWER = "I could not find relevant information in the transcript."
+
+def cached_answer_stream(answer: str):
+    yield answer
+
+def plain_matches(matches) -> list[dict]:
+    """
+    Copies index matches into plain dicts. Pinecone returns ScoredVector objects, which
+    are not mappings, so nothing past retrieval should depend on the index's types.
+    """
+    def field(match, name, default=None):
+        # Dicts are read by key: getattr would find dict methods such as `values`
+        value = match.get(name) if isinstance(match, dict) else getattr(match, name, None)
+        return default if value is None else value
+
+    return [
+        {
+            "id": field(match, "id"),
+            "score": field(match, "score", 0.0),
+            "metadata": dict(field(match, "metadata", {})),
+            # Pinecone returns an empty list when values were not requested
+            "values": field(match, "values") or None,
+        }
+        for match in matches
+    ]
+
+def lexical_search(query: str, top_k: int, video_id: str) -> dict:
+    with span("lexical.query"):
+        return lexical_index.query(query, top_k, video_id)
+
+def retrieve_contexts(index, query: str, query_vector: np.ndarray, video_id: str, top_k: int,
+                      report: dict | None = None) -> tuple[list[str], list[str]]:
+    """
+    Returns (contexts for the prompt, contexts for display), numbered alike; both are
+    empty when nothing relevant was found. Packing stats go in `report` when given.
+    """
+    # 1. Retrieve context from the vector index, and by keyword in parallel
+    candidates = top_k * HYBRID_CANDIDATES_PER_RESULT if HYBRID_SEARCH else top_k
+    if HYBRID_SEARCH:
+        # Run in a copy of this context so the search still counts towards the request's spans
+        lexical_future = search_executor.submit(
+            contextvars.copy_context().run, lexical_search, query, candidates, video_id
+        )
+    query_embedding = query_vector.tolist()
+    with span("index.query"):
+        query_result = index.query(
+            vector=query_embedding, top_k=candidates, include_metadata=True, namespace=video_id,
+            # Vectors let the packer spot near-duplicate contexts without re-encoding them
+            include_values=CONTEXT_CONFIG["dedup_threshold"] < 1,
+        )
+    matches = plain_matches(query_result.get('matches', []))
+    if HYBRID_SEARCH:
+        lexical_matches = lexical_future.result().get('matches', [])
+        matches = reciprocal_rank_fusion([matches, lexical_matches], k=RRF_K)
+    # A few spare hits can take the place of ones merged or dropped as duplicates
+    matches = matches[:top_k * 2]
     if not matches:
-        def empty_stream():
-            yield "I could not find relevant information in the transcript."
-        return empty_stream(), []
+        return [], []
 
-    # 2. Format contexts (this part is unchanged)
+    # 2. Pack contexts: merge neighbours, drop near-duplicates, fit the token budget.
+    #    The [i] numbering is shared by the prompt and the contexts shown to the user.
+    with span("context.pack"):
+        packed, packing_report = pack_contexts(matches, top_k, encode=encode_texts)
+    print(f"Packed {packing_report['hits']} hits into {packing_report['contexts']} contexts, "
+          f"saving {packing_report['tokens_saved']} prompt tokens")
+    if report is not None:
+        report["context_packing"] = packing_report
     contexts_for_llm = []
     contexts_for_display = []
-    for i, match in enumerate(matches):
-        metadata = match['metadata']
-        text = metadata.get('text', '')
-        start_time = metadata.get('start', 0)
-        end_time = metadata.get('end', 0)
-        source_tag = f"Timestamp: [{convert_to_timestamp(start_time)} - {convert_to_timestamp(end_time)}]"
+    for i, context in enumerate(packed):
+        text = context['text']
+        source_tag = f"Timestamp: [{convert_to_timestamp(context['start'])} - {convert_to_timestamp(context['end'])}]"
         contexts_for_llm.append(f"Context [{i}] ({source_tag}):\n{text}")
-        contexts_for_display.append(f"Speaker {metadata.get('speaker', 'Unknown')}: \"{text}\"\n*({source_tag})*")
+        contexts_for_display.append(f"[{i}] Speaker {context['speaker']}: \"{text}\"\n*({source_tag})*")
+    return contexts_for_llm, contexts_for_display
+
+def query_video(index, query: str, video_id: str = "", top_k: int = 5, report: dict | None = None):
+    """
+    Retrieves context from the video's namespace and calls the streaming generator for the answer.
+    A question close enough to one already answered for this video reuses that answer.
+    Context packing stats (tokens saved) go in `report` when given.
+    """
+    query_vector = embed_query_cached(query)
+    if ANSWER_CACHE_ENABLED:
+        generation = answer_cache.generation(video_id)
+        if cached := answer_cache.lookup(video_id, query_vector, top_k):
+            print(f"Answer cache hit for video '{video_id}'")
+            increment("answer_cache.hits")
+            answer, contexts = cached
+            return cached_answer_stream(answer), contexts
 
-    # 3. Call the streaming generator and return it
-    answer_stream = get_groq_response_streamed(query, " ".join(contexts_for_llm))
+    contexts_for_llm, contexts_for_display = retrieve_contexts(index, query, query_vector, video_id, top_k, report)
+    if not contexts_for_llm:
+        return cached_answer_stream(NO_CONTEXT_ANSWER), []
+
+    # Call the streaming generator and return it
+    on_complete = None
+    if ANSWER_CACHE_ENABLED:
+        def on_complete(answer: str):
+            answer_cache.store(video_id, query_vector, top_k, answer, contexts_for_display, generation)
+    answer_stream = get_groq_response_streamed(query, " ".join(contexts_for_llm), on_complete)
     
-    return answer_stream, contexts_for_display
\ No newline at end of file
+    return answer_stream, contexts_for_display
+
+def answer_questions(index, queries: list[str], video_id: str = "", top_k: int = 5):
+    """
+    Answers many questions about one video. Every uncached query is embedded in a single
+    forward pass; each question's retrieval and Groq completion then run on
+    `batch_executor`, with completions paced by the shared Groq limiter.
+    Yields (position, result) as each question finishes, so not in input order.
+    """
+    with span("query.embed_batch"):
+        query_vectors = embed_queries_cached(queries)
+    generation = answer_cache.generation(video_id) if ANSWER_CACHE_ENABLED else None
+
+    def answer_one(query: str, query_vector: np.ndarray) -> dict:
+        if ANSWER_CACHE_ENABLED and (cached := answer_cache.lookup(video_id, query_vector, top_k)):
+            increment("answer_cache.hits")
+            answer, contexts = cached
+            return {"query": query, "answer": answer, "contexts": contexts, "cached": True}
+        report = {}
+        contexts_for_llm, contexts_for_display = retrieve_contexts(index, query, query_vector, video_id, top_k, report)
+        if not contexts_for_llm:
+            return {"query": query, "answer": NO_CONTEXT_ANSWER, "contexts": [], "cached": False}
+        answer = get_groq_answer(query, " ".join(contexts_for_llm))
+        if ANSWER_CACHE_ENABLED:
+            answer_cache.store(video_id, query_vector, top_k, answer, contexts_for_display, generation)
+        return {"query": query, "answer": answer, "contexts": contexts_for_display, "cached": False, **report}
+
+    # Each task runs in its own copy of this context so its spans count towards the request
+    futures = {
+        batch_executor.submit(contextvars.copy_context().run, answer_one, query, query_vector): i
+        for i, (query, query_vector) in enumerate(zip(queries, query_vectors))
+    }
+    try:
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"query": queries[i], "error": str(e)}
+            yield i, result
+    finally:
+        # Closing the generator early (e.g. the client went away) drops questions not yet started
+        for future in futures:
+            future.cancel()
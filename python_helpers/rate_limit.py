@@ -0,0 +1,153 @@
+# rate_limit.py
+
+import os
+import time
+import random
+import asyncio
+import threading
+
+from python_helpers.metrics import span, increment
+
+# --- 1. CONFIGURATION ---
+# Groq's per-model limits; the defaults are the free tier for llama-3.1-8b-instant
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+# Completion tokens to reserve per call, on top of the prompt's estimate
+GROQ_COMPLETION_TOKENS = int(os.getenv("GROQ_COMPLETION_TOKENS", "400"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 30.0
+
+# --- 2. TOKEN BUCKETS ---
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills at `rate` per second.
+    State is guarded by a thread lock and waits happen outside it, so one bucket can be
+    shared by coroutines on any event loop and by plain threads.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _take(self, amount: float) -> float:
+        """Takes `amount` if available and returns 0, else returns seconds to wait."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    async def acquire(self, amount: float = 1):
+        while (wait := self._take(amount)) > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, amount: float = 1):
+        while (wait := self._take(amount)) > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stops handing out tokens for `seconds`, e.g. after the server said to back off."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            # Refill from the end of the pause, so it does not end in a burst
+            self._updated = self._blocked_until
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets; a call needs room in both."""
+
+    def __init__(self, requests_per_minute: float = GROQ_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = GROQ_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+
+    async def acquire(self, tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+    def acquire_blocking(self, tokens: int):
+        self.requests.acquire_blocking(1)
+        self.tokens.acquire_blocking(tokens)
+
+    def pause(self, seconds: float):
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
+
+# Shared by every Groq caller in the process
+groq_limiter = RateLimiter()
+
+# --- 3. RETRIES ---
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """The server's Retry-After hint, if the error carries an HTTP response with one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def rate_limit_backoff(error: Exception, attempt: int) -> float:
+    """Retry-After when given, else jittered exponential backoff."""
+    hint = retry_after_seconds(error)
+    if hint is not None:
+        return hint
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+async def ainvoke_limited(llm, prompt: str, limiter: RateLimiter = groq_limiter,
+                          max_retries: int = LLM_MAX_RETRIES) -> str:
+    """
+    Calls `llm.ainvoke(prompt)` once the limiter has room, retrying on 429 (which also
+    pauses the shared limiter so concurrent callers back off together). Returns the text.
+    """
+    tokens = estimate_tokens(prompt) + GROQ_COMPLETION_TOKENS
+    for attempt in range(max_retries + 1):
+        with span("llm.rate_limit_wait"):
+            await limiter.acquire(tokens)
+        try:
+            with span("llm.call"):
+                response = await llm.ainvoke(prompt)
+            return response.content
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == max_retries:
+                raise
+            increment("llm.rate_limited")
+            delay = rate_limit_backoff(e, attempt)
+            print(f"Rate limited by the LLM; retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            limiter.pause(delay)
+
+def invoke_limited(call, tokens: int, limiter: RateLimiter = groq_limiter,
+                   max_retries: int = LLM_MAX_RETRIES):
+    """Blocking counterpart of ainvoke_limited for worker threads: `call()` reserving `tokens`."""
+    for attempt in range(max_retries + 1):
+        with span("llm.rate_limit_wait"):
+            limiter.acquire_blocking(tokens)
+        try:
+            with span("llm.call"):
+                return call()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == max_retries:
+                raise
+            increment("llm.rate_limited")
+            delay = rate_limit_backoff(e, attempt)
+            print(f"Rate limited by the LLM; retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            limiter.pause(delay)
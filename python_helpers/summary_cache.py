@@ -0,0 +1,80 @@
+# summary_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+# --- 1. CONFIGURATION ---
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE", "true").lower() in ("1", "true", "yes")
+SUMMARY_CACHE_PATH = os.getenv(
+    "SUMMARY_CACHE_PATH", os.path.join(tempfile.gettempdir(), "yt-vid-talker-summaries.sqlite3")
+)
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "20000"))
+
+def summary_key(*parts) -> str:
+    """Stable hash of everything that determines an LLM output (model, prompt, parameters)."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# --- 2. CACHE ---
+
+class SummaryCache:
+    """
+    SQLite map from a summary_key to generated text, for LLM calls whose output only
+    depends on their input (map, collapse and reduce summaries). Least recently used
+    rows are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, path: str = SUMMARY_CACHE_PATH, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self._db.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT text FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return row[0]
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, text, last_used) VALUES (?, ?, ?)",
+                (key, text, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM summaries WHERE key IN ("
+                " SELECT key FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_summary_cache() -> SummaryCache | None:
+    """Opens the shared cache on first use; None when SUMMARY_CACHE is off."""
+    global _cache
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SummaryCache()
+    return _cache
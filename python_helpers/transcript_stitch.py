@@ -0,0 +1,41 @@
+# transcript_stitch.py
+
+def scoped_speaker(segment: int, speaker_id) -> str:
+    """
+    Prefixes a speaker id with its segment number (e.g. "s1:0"). Each segment is diarized
+    on its own, so its ids say nothing about who speaks in any other segment.
+    """
+    return f"s{segment}:{speaker_id}"
+
+def stitch_transcripts(parts: list[tuple[float, dict]]) -> dict:
+    """
+    Merges per-segment Sarvam transcripts, given as (offset_seconds, transcript) pairs in
+    audio order, into one transcript, shifting entry timestamps by each segment's offset.
+
+    Speakers are not reconciled across segments. With more than one segment, ids are
+    scoped to their segment ("s0:0", "s1:0", ...), so the same person has a different id
+    in each one; a single segment keeps Sarvam's ids as they are.
+    """
+    if not parts:
+        return {"transcript": "", "diarized_transcript": {"entries": []}}
+
+    merged = {key: value for key, value in parts[0][1].items()
+              if key not in ("transcript", "diarized_transcript")}
+    texts = []
+    entries = []
+    scoped = len(parts) > 1
+
+    for segment, (offset, transcript) in enumerate(parts):
+        if transcript.get("transcript"):
+            texts.append(transcript["transcript"].strip())
+        for entry in (transcript.get("diarized_transcript") or {}).get("entries", []):
+            entry = dict(entry)
+            entry["start_time_seconds"] = entry.get("start_time_seconds", 0) + offset
+            entry["end_time_seconds"] = entry.get("end_time_seconds", 0) + offset
+            if scoped:
+                entry["speaker_id"] = scoped_speaker(segment, entry.get("speaker_id", "Unknown"))
+            entries.append(entry)
+
+    merged["transcript"] = " ".join(texts)
+    merged["diarized_transcript"] = {"entries": entries}
+    return merged
@@ -0,0 +1,155 @@
+# vector_index.py
+
+import os
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# --- 1. CONFIGURATION ---
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "./local_index")
+DEFAULT_NAMESPACE = "__default__"
+# Namespaces (one per video) kept loaded for queries; the least recently used are dropped
+LOCAL_INDEX_CACHED_NAMESPACES = int(os.getenv("LOCAL_INDEX_CACHED_NAMESPACES", "32"))
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Returns float32 rows scaled to unit length, so a dot product is cosine similarity."""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+# --- 2. LOCAL BACKEND ---
+
+class LocalVectorIndex:
+    """
+    In-process index implementing the subset of the Pinecone Index API this app uses
+    (upsert, query, delete, describe_index_stats), so it can be swapped in for `pc.Index`.
+
+    Each namespace is stored as a `vectors.npy` float32 matrix of normalized rows, loaded
+    memory-mapped, next to a `records.json` holding the ids and metadata in row order.
+    """
+
+    def __init__(self, root: str = LOCAL_INDEX_DIR, dimension: int = 384,
+                 cached_namespaces: int = LOCAL_INDEX_CACHED_NAMESPACES):
+        self.root = root
+        self.dimension = dimension
+        self.cached_namespaces = cached_namespaces
+        self._namespaces = OrderedDict()
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, namespace: str) -> str:
+        return os.path.join(self.root, namespace or DEFAULT_NAMESPACE)
+
+    def _load(self, namespace: str):
+        """Returns (matrix, records) for a namespace, loading it from disk unless cached."""
+        namespace = namespace or DEFAULT_NAMESPACE
+        if namespace in self._namespaces:
+            self._namespaces.move_to_end(namespace)
+        else:
+            directory = self._dir(namespace)
+            try:
+                matrix = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+                with open(os.path.join(directory, "records.json"), "r") as f:
+                    records = json.load(f)
+            except FileNotFoundError:
+                matrix = np.empty((0, self.dimension), dtype=np.float32)
+                records = []
+            self._namespaces[namespace] = (matrix, records)
+            while len(self._namespaces) > self.cached_namespaces:
+                self._namespaces.popitem(last=False)
+        return self._namespaces[namespace]
+
+    def _save(self, namespace: str, matrix: np.ndarray, records: list):
+        namespace = namespace or DEFAULT_NAMESPACE
+        directory = self._dir(namespace)
+        os.makedirs(directory, exist_ok=True)
+        # Write to temp files and swap them in, so readers never see a half-written namespace
+        with open(os.path.join(directory, "vectors.tmp.npy"), "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        with open(os.path.join(directory, "records.tmp.json"), "w") as f:
+            json.dump(records, f)
+        os.replace(os.path.join(directory, "vectors.tmp.npy"), os.path.join(directory, "vectors.npy"))
+        os.replace(os.path.join(directory, "records.tmp.json"), os.path.join(directory, "records.json"))
+        self._namespaces.pop(namespace, None)
+
+    def upsert(self, vectors: list[dict], namespace: str = ""):
+        """Inserts or overwrites vectors given as {"id", "values", "metadata"} dicts."""
+        with self._lock:
+            matrix, records = self._load(namespace)
+            matrix = np.array(matrix)
+            records = list(records)
+            positions = {record["id"]: row for row, record in enumerate(records)}
+
+            # Normalize all incoming rows in one pass (values may be lists or NumPy rows)
+            rows = normalize_rows([vector["values"] for vector in vectors]) if vectors else []
+            new_rows = []
+            for vector, row in zip(vectors, rows):
+                record = {"id": vector["id"], "metadata": vector.get("metadata", {})}
+                if vector["id"] in positions:
+                    matrix[positions[vector["id"]]] = row
+                    records[positions[vector["id"]]] = record
+                else:
+                    positions[vector["id"]] = len(records)
+                    records.append(record)
+                    new_rows.append(row)
+
+            if new_rows:
+                matrix = np.vstack([matrix, np.stack(new_rows)])
+            self._save(namespace, matrix, records)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True,
+              include_values: bool = False, namespace: str = "", **kwargs) -> dict:
+        """Returns the `top_k` rows with the highest cosine similarity to `vector`."""
+        with self._lock:
+            matrix, records = self._load(namespace)
+        if not records:
+            return {"matches": []}
+
+        scores = matrix @ normalize_rows(vector)[0]
+        k = min(top_k, len(records))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for row in top:
+            match = {"id": records[row]["id"], "score": float(scores[row])}
+            if include_metadata:
+                match["metadata"] = records[row]["metadata"]
+            if include_values:
+                match["values"] = matrix[row].tolist()
+            matches.append(match)
+        return {"matches": matches}
+
+    def delete(self, ids: list[str] | None = None, delete_all: bool = False, namespace: str = ""):
+        with self._lock:
+            matrix, records = self._load(namespace)
+            if delete_all:
+                keep = []
+            else:
+                drop = set(ids or [])
+                keep = [row for row, record in enumerate(records) if record["id"] not in drop]
+            self._save(namespace, np.asarray(matrix)[keep], [records[row] for row in keep])
+
+    def vector_count(self, namespace: str = "") -> int:
+        """Counts a namespace's vectors from the `.npy` header, without loading or caching it."""
+        with self._lock:
+            try:
+                return np.load(os.path.join(self._dir(namespace), "vectors.npy"), mmap_mode="r").shape[0]
+            except FileNotFoundError:
+                return 0
+
+    def describe_index_stats(self) -> dict:
+        with self._lock:
+            namespaces = {}
+            for name in sorted(os.listdir(self.root)):
+                if os.path.isdir(self._dir(name)):
+                    # Report the default namespace as "" like Pinecone does
+                    namespaces["" if name == DEFAULT_NAMESPACE else name] = {"vector_count": self.vector_count(name)}
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values()),
+        }
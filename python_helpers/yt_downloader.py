@@ -1,33 +1,127 @@
 import yt_dlp
-from pydub import AudioSegment
 import os
+import re
+import json
+import hashlib
+import subprocess
 
-def download_audio_from_url(url):
-    original_audio = "audio.mp3"
-    converted_audio = "audio_16Khz.mp3"
+from python_helpers.metrics import span
+
+# The transcriber takes 16 kHz mono; set TRANSCRIBE_AUDIO_CODEC=wav or flac to upload lossless audio
+AUDIO_CONFIG = {
+    "sample_rate": 16000,
+    "channels": 1,
+    "codec": os.getenv("TRANSCRIBE_AUDIO_CODEC", "mp3"),
+}
+
+# ffmpeg encoder arguments per output codec
+AUDIO_CODEC_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "flac": ["-c:a", "flac"],
+}
+
+YOUTUBE_ID_PATTERN = re.compile(
+    r"(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})"
+)
+# Every id extract_video_id can return; ids also name index directories, so nothing else is accepted
+VIDEO_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{11}|url-[0-9a-f]{16}")
+
+def extract_video_id(url):
+    """Returns the canonical 11-character YouTube id, or a stable hash for other URLs."""
+    match = YOUTUBE_ID_PATTERN.search(url)
+    if match:
+        return match.group(1)
+    return "url-" + hashlib.sha256(url.strip().encode("utf-8")).hexdigest()[:16]
+
+def is_video_id(video_id: str) -> bool:
+    return VIDEO_ID_PATTERN.fullmatch(video_id) is not None
+
+def expand_playlist(url, max_videos=200, _depth=0):
+    """
+    Lists the video URLs behind a playlist or channel URL with yt-dlp's flat extraction,
+    which reads the listing pages without resolving or downloading any video. A plain
+    video URL comes back as a one-element list.
+    """
+    ydl_opts = {"extract_flat": "in_playlist", "skip_download": True, "quiet": True}
+    with span("ytdlp.expand"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    if info.get("_type") not in ("playlist", "multi_video"):
+        return [info.get("webpage_url") or url]
+    urls = []
+    for entry in info.get("entries") or []:
+        if not entry or len(urls) >= max_videos:
+            continue
+        entry_url = entry.get("url") or entry.get("webpage_url") or ""
+        if YOUTUBE_ID_PATTERN.search(entry_url):
+            urls.append(entry_url)
+        elif entry.get("ie_key") == "Youtube" and entry.get("id"):
+            urls.append(f"https://www.youtube.com/watch?v={entry['id']}")
+        elif entry_url and _depth < 1:
+            # Channel pages list their tabs (Videos, Shorts, ...) as nested playlists
+            urls.extend(expand_playlist(entry_url, max_videos - len(urls), _depth + 1))
+    return urls[:max_videos]
+
+def resample_args():
+    return ["-ar", str(AUDIO_CONFIG["sample_rate"]), "-ac", str(AUDIO_CONFIG["channels"])]
+
+def download_audio_from_url(url, output_dir="."):
+    """
+    Downloads the best audio stream and lets yt-dlp's ffmpeg postprocessor write it
+    straight out as 16 kHz mono in the configured codec, in a single encode.
+    """
+    codec = AUDIO_CONFIG["codec"]
+    converted_audio = os.path.join(output_dir, f"audio_16Khz.{codec}")
     ydl_opts = {
         "format" : "bestaudio/best",
-        "outtmpl" : "audio.%(ext)s",
+        "outtmpl" : os.path.join(output_dir, "audio_16Khz.%(ext)s"),
         "postprocessors" : [
             {
                 "key" : "FFmpegExtractAudio",
-                "preferredcodec" : "mp3"
+                "preferredcodec" : codec
             }
-        ]
+        ],
+        # Output-side ffmpeg arguments for the ExtractAudio step
+        "postprocessor_args" : {"extractaudio+ffmpeg_o": resample_args()},
     }
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    with span("ytdlp.download"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
         ydl.download([url])
-    convert_to_16Khz(original_audio, converted_audio)
 
-    if os.path.exists(original_audio):
-        os.remove(original_audio)
-        print(f"Cleaned up temporary file: {original_audio}")
+    # yt-dlp copies the stream without re-encoding when the source already has the
+    # target codec, in which case the resample arguments were never applied
+    if probe_audio_format(converted_audio) != (AUDIO_CONFIG["sample_rate"], AUDIO_CONFIG["channels"]):
+        print(f"Source was not resampled by yt-dlp; converting {converted_audio}")
+        temp_audio = os.path.join(output_dir, f"audio_source.{codec}")
+        os.replace(converted_audio, temp_audio)
+        with span("ffmpeg.resample"):
+            convert_to_16Khz(temp_audio, converted_audio)
+        os.remove(temp_audio)
+        print(f"Cleaned up temporary file: {temp_audio}")
+    return converted_audio
+
+def probe_audio_format(path):
+    """Returns (sample_rate, channels) of the first audio stream, or None if unreadable."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=sample_rate,channels", "-of", "json", path],
+            capture_output=True, text=True, check=True,
+        )
+        stream = json.loads(result.stdout)["streams"][0]
+        return int(stream["sample_rate"]), int(stream["channels"])
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError, IndexError):
+        return None
 
 def convert_to_16Khz(input_file, output_file):
-    audio = AudioSegment.from_mp3(input_file)
-    audio = audio.set_frame_rate(16000)
-    audio.export(output_file, format="mp3")
+    """Resamples any local audio file with one streaming ffmpeg pass (constant memory)."""
+    codec = os.path.splitext(output_file)[1].lstrip(".") or AUDIO_CONFIG["codec"]
+    subprocess.run(
+        ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-i", input_file, "-vn",
+         *resample_args(), *AUDIO_CODEC_ARGS.get(codec, []), output_file],
+        check=True,
+    )
 
 if __name__ == "__main__":
     url = "https://www.youtube.com/watch?v=rbgjYX9n_dA"
-    download_audio_from_url(url)
\ No newline at end of file
+    download_audio_from_url(url)